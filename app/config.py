@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -6,6 +7,9 @@ class Settings(BaseSettings):
     # Security
     JWT_SECRET: str = "dev-secret-key-change-in-production"
     JWT_ALG: str = "HS256"
+    JWT_BACKEND: str = "jose"                   # or "pyjwt" if PyJWT is installed
+    AUTH_TOKEN_CACHE_SIZE: int = 10000          # verified tokens kept in memory; 0 disables
+    AUTH_TOKEN_CACHE_MAX_TTL_SECONDS: float = 3600.0
     WEBHOOK_SECRET: str = "dev-webhook-secret-change-in-production"
 
     # SMTP Settings
@@ -13,17 +17,126 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     SMTP_USER: str = ""
     SMTP_PASS: str = ""
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT_SECONDS: float = 20.0
+    SMTP_POOL_SIZE: int = 8                      # sessions per host/user
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 60.0
+    SMTP_NOOP_AFTER_SECONDS: float = 15.0        # probe sessions idle longer than this
 
     # Twilio Settings
     TWILIO_ACCOUNT_SID: str = ""
     TWILIO_AUTH_TOKEN: str = ""
     TWILIO_FROM: str = ""
+    TWILIO_API_BASE: str = ""           # override for a local fake endpoint, e.g. http://127.0.0.1:8089
+    TWILIO_TIMEOUT_SECONDS: float = 10.0
+    TWILIO_MAX_RATE: float = 10.0       # messages/second ceiling; 0 = unpaced until the first 429
+    TWILIO_MIN_RATE: float = 1.0
 
     # Database
     DATABASE_URL: str = "sqlite:///reminders.db"
+    # Async engine pool used by the API routes
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    # SQLite file databases: pragmas applied to every connection (see services/sqlite.py)
+    SQLITE_JOURNAL_MODE: str = "WAL"            # "" keeps SQLite's default (DELETE)
+    SQLITE_SYNCHRONOUS: str = "NORMAL"          # FULL for fsync on every commit
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456           # bytes; 0 disables memory-mapped reads
+    SQLITE_CACHE_SIZE_KIB: int = 65536          # page cache per connection
+    # Group commit: concurrent API/scheduler writes share one transaction
+    SQLITE_GROUP_COMMIT: bool = True
+    SQLITE_GROUP_COMMIT_WINDOW_MS: float = 0.0     # extra wait for stragglers; 0 = batch what queued during the last commit
+    SQLITE_GROUP_COMMIT_MAX_BATCH: int = 256
+    # Background fill of epoch-ms columns for rows created before they existed
+    BACKFILL_BATCH_SIZE: int = 1000
+    BACKFILL_PAUSE_SECONDS: float = 0.05
+    BACKFILL_RECHECK_SECONDS: float = 30.0      # how often other processes look whether the backfill has finished
+
+    # Read-through cache for reminders by id ("memory" or "none")
+    REMINDER_CACHE_BACKEND: str = "memory"
+    REMINDER_CACHE_SIZE: int = 10000
+    REMINDER_CACHE_TTL_SECONDS: float = 30.0
+
+    # Compiled message templates (services/templates.py)
+    TEMPLATE_CACHE_SIZE: int = 1000
+    TEMPLATE_CACHE_TTL_SECONDS: float = 60.0    # how soon template edits reach other processes
+
+    # Dispatcher: only reminders due within the horizon are held in memory
+    DISPATCH_HORIZON_SECONDS: int = 900
+    DISPATCH_REFILL_SECONDS: int = 60
+    DISPATCH_BATCH_SIZE: int = 1000
+    DISPATCH_WORKERS: int = 10
+
+    # Set RUN_SCHEDULER_IN_API=false when a separate `python -m app.dispatcher` owns
+    # scheduling and delivery; API workers then only write and signal changes.
+    RUN_SCHEDULER_IN_API: bool = True
+    DISPATCH_WATCH_SECONDS: float = 1.0       # poll interval of the updated_ts change feed; 0 disables
+    DISPATCH_WATCH_LAG_SECONDS: float = 5.0   # re-read this far behind the newest change (clock skew, slow commits)
+    DISPATCH_NOTIFY: bool = False             # Postgres: NOTIFY on writes so the dispatcher wakes without waiting a poll
+    DISPATCHER_METRICS_PORT: int = 9101       # /metrics of the standalone dispatcher; 0 disables
+
+    # Leases let several dispatcher processes share the due queue safely
+    DISPATCH_NODE_ID: str = ""          # defaults to "<hostname>:<pid>"
+    DISPATCH_LEASE_SECONDS: int = 300   # renewed every third of this while a claimed reminder waits to be sent
+    DISPATCH_CLAIM_BATCH: int = 100
+
+    # Delivery worker pool
+    DELIVERY_EMAIL_CONCURRENCY: int = 8
+    DELIVERY_SMS_CONCURRENCY: int = 8
+    DELIVERY_QUEUE_SIZE: int = 10000
+    DELIVERY_SUBMIT_TIMEOUT_SECONDS: float = 5.0
+    DELIVERY_MAX_ATTEMPTS: int = 3
+    DELIVERY_RETRY_BASE_SECONDS: float = 1.0
+    DELIVERY_RETRY_MAX_SECONDS: float = 10.0
+    # Peak smoothing: per-channel token buckets "channel=rate[:burst]" (msgs/s, e.g. "email=50:100,sms=10";
+    # empty = unlimited), a per-recipient bucket (0 = off), and how late low-priority sends may go.
+    DELIVERY_RATE_LIMITS: str = ""
+    DELIVERY_RECIPIENT_RATE: float = 0.0
+    DELIVERY_RECIPIENT_BURST: float = 3.0
+    DELIVERY_LOW_PRIORITY_TOLERANCE_SECONDS: float = 120.0
+    # Digests: reminders for one recipient and channel arriving within the window go out as a
+    # single message (0 = off; must be below DISPATCH_LEASE_SECONDS).
+    DIGEST_WINDOW_SECONDS: float = 0.0
+    DIGEST_MAX_ITEMS: int = 10
+
+    # Delivery outcome write-back (outbox)
+    OUTBOX_FLUSH_INTERVAL_SECONDS: float = 0.25 # one status/attempt transaction per interval
+    OUTBOX_MAX_BATCH: int = 500                 # flush early once this many outcomes are pending
+    OUTBOX_MAX_RETRIES: int = 3                 # failed flushes in a row before entries are written one by one
+
+    # Retention purge (nightly)
+    RETENTION_DAYS: int = 30
+    RETENTION_BATCH_SIZE: int = 1000            # rows per delete transaction
+    RETENTION_PAUSE_SECONDS: float = 0.1        # sleep between batches
+    RETENTION_ARCHIVE_DIR: str = ""             # write purged rows here first; empty = no archive
+    RETENTION_ARCHIVE_FORMAT: str = "ndjson"    # or "csv"; files are gzip-compressed
+    RETENTION_DRY_RUN: bool = False             # count what would be purged, delete nothing
+
+    # Tracing / profiling
+    TRACING_ENABLED: bool = False               # per-stage timing histograms (+ OpenTelemetry spans when installed)
+    TRACING_EXPORTER: str = ""                  # "otlp" to export spans via the OpenTelemetry SDK
+    TRACING_OTLP_ENDPOINT: str = "http://127.0.0.1:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "healthcare-reminders"
+    PROFILER_MAX_SECONDS: float = 60.0          # upper bound for GET /admin/profile
+
+    # Export
+    EXPORT_BATCH_SIZE: int = 1000               # rows fetched per round trip by GET /admin/reminders/export
 
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000                 # records buffered for the log writer thread; 0 = unbounded
+    LOG_RATE_LIMITS: str = "app.services.delivery=100"  # "logger=rate[:burst],..." per message template, below WARNING
+
+    @model_validator(mode="after")
+    def check_digest_window(self):
+        # Held digest members keep their lease (renewed meanwhile); a window as long as
+        # the lease itself would mean waiting past a whole lease for one message.
+        if self.DIGEST_WINDOW_SECONDS >= self.DISPATCH_LEASE_SECONDS:
+            raise ValueError("DIGEST_WINDOW_SECONDS must be below DISPATCH_LEASE_SECONDS")
+        return self
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,122 @@
+"""Local stand-in for an OpenTelemetry collector's OTLP/HTTP trace endpoint.
+
+Accepts ``POST /v1/traces`` (protobuf or JSON), answers 200 and counts what it
+receives; with ``--verbose`` it prints span names and durations (protobuf bodies
+are decoded when ``opentelemetry-proto`` is installed)::
+
+    python -m app.devtools.fake_collector --port 4318 --verbose
+    TRACING_ENABLED=true TRACING_EXPORTER=otlp uvicorn app.main:app
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def _spans_from_json(body: bytes) -> Iterator[Tuple[str, float]]:
+    payload = json.loads(body)
+    for rs in payload.get("resourceSpans", []):
+        for ss in rs.get("scopeSpans", []):
+            for sp in ss.get("spans", []):
+                yield sp.get("name", "?"), (int(sp.get("endTimeUnixNano", 0)) - int(sp.get("startTimeUnixNano", 0))) / 1e6
+
+
+def _spans_from_protobuf(body: bytes) -> Iterator[Tuple[str, float]]:
+    try:
+        from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+    except ImportError:
+        return
+    req = ExportTraceServiceRequest()
+    req.ParseFromString(body)
+    for rs in req.resource_spans:
+        for ss in rs.scope_spans:
+            for sp in ss.spans:
+                yield sp.name, (sp.end_time_unix_nano - sp.start_time_unix_nano) / 1e6
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server: "FakeCollector" = self.server  # type: ignore[assignment]
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.rstrip("/") != "/v1/traces":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        is_json = "json" in (self.headers.get("Content-Type") or "")
+        spans = list(_spans_from_json(body) if is_json else _spans_from_protobuf(body))
+        server.record(len(body), spans)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json" if is_json else "application/x-protobuf")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class FakeCollector(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, verbose: bool = False):
+        super().__init__((host, port), _Handler)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+        self.spans: List[Tuple[str, float]] = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://{self.server_address[0]}:{self.port}/v1/traces"
+
+    def record(self, size: int, spans: List[Tuple[str, float]]):
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+            self.spans.extend(spans)
+        if self.verbose:
+            for name, ms in spans:
+                print(f"{name:40s} {ms:10.3f} ms")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"requests": self.requests, "bytes": self.bytes, "spans": len(self.spans)}
+
+    def start(self) -> "FakeCollector":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-collector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OTLP/HTTP trace collector stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--verbose", action="store_true", help="print every received span")
+    args = parser.parse_args()
+    server = FakeCollector(args.host, args.port, args.verbose)
+    print(f"fake collector listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Minimal in-process SMTP server for offline delivery tests and load runs.
+
+Speaks just enough ESMTP for ``smtplib`` (EHLO/HELO, AUTH PLAIN/LOGIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT), accepts any credentials and only counts what it receives.
+STARTTLS is not offered, so point the app at it with ``SMTP_STARTTLS=false``::
+
+    python -m app.devtools.fake_smtp --port 1025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_USER=dev SMTP_PASS=dev SMTP_STARTTLS=false uvicorn app.main:app
+"""
+import argparse
+import socketserver
+import threading
+import time
+from typing import Optional
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server: "FakeSMTPServer" = self.server  # type: ignore[assignment]
+        with server.lock:
+            server.connections += 1
+        self._reply("220 fake-smtp ready")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode(errors="replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+            if server.latency:
+                time.sleep(server.latency)
+            if verb == "EHLO":
+                self.wfile.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif verb == "HELO":
+                self._reply("250 fake-smtp")
+            elif verb == "AUTH":
+                parts = cmd.split()
+                if len(parts) == 2 and parts[1].upper() == "LOGIN":
+                    self._reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self._reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                self._reply("235 2.7.0 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    size += len(line)
+                with server.lock:
+                    server.messages += 1
+                    server.bytes += size
+                self._reply("250 OK queued")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.bytes = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakeSMTPServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-smtp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake SMTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each reply")
+    args = parser.parse_args()
+    server = FakeSMTPServer(args.host, args.port, args.latency)
+    print(f"fake SMTP listening on {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"connections={server.connections} messages={server.messages} bytes={server.bytes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Fake Twilio Messages API for offline SMS load tests.
+
+Accepts ``POST /2010-04-01/Accounts/<sid>/Messages.json`` over keep-alive HTTP/1.1
+and answers like Twilio would. ``--rate`` caps accepted messages per second and
+answers the excess with 429, so adaptive throttling can be exercised::
+
+    python -m app.devtools.fake_twilio --port 8089 --rate 50
+    TWILIO_ACCOUNT_SID=ACfake TWILIO_AUTH_TOKEN=x TWILIO_FROM=+15550000000 \\
+        TWILIO_API_BASE=http://127.0.0.1:8089 uvicorn app.main:app
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs
+
+_MESSAGES = re.compile(r"^/2010-04-01/Accounts/(?P<sid>[^/]+)/Messages\.json$")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server: "FakeTwilioServer" = self.server  # type: ignore[assignment]
+        form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode())
+        match = _MESSAGES.match(self.path)
+        if not match:
+            self._json(404, {"code": 20404, "message": "Not Found", "status": 404})
+            return
+        if server.latency:
+            time.sleep(server.latency)
+        if not server.admit():
+            self._json(429, {"code": 20429, "message": "Too Many Requests", "status": 429})
+            return
+        sid = "SM" + uuid.uuid4().hex
+        self._json(201, {
+            "sid": sid,
+            "account_sid": match.group("sid"),
+            "to": form.get("To", [""])[0],
+            "from": form.get("From", [""])[0],
+            "body": form.get("Body", [""])[0],
+            "status": "queued",
+            "num_segments": "1",
+            "direction": "outbound-api",
+            "api_version": "2010-04-01",
+            "uri": f"{self.path[:-5]}/{sid}.json",
+        })
+
+
+class FakeTwilioServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rate: float = 0.0, latency: float = 0.0):
+        super().__init__((host, port), _Handler)
+        self.rate = rate
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.throttled = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.port}"
+
+    def admit(self) -> bool:
+        with self.lock:
+            if self.rate > 0:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                if self._window_count >= self.rate:
+                    self.throttled += 1
+                    return False
+                self._window_count += 1
+            self.accepted += 1
+            return True
+
+    def start(self) -> "FakeTwilioServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-twilio", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Twilio Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--rate", type=float, default=0.0, help="accepted messages per second (0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+    server = FakeTwilioServer(args.host, args.port, args.rate, args.latency)
+    print(f"fake Twilio listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"accepted={server.accepted} throttled={server.throttled}")
+
+
+if __name__ == "__main__":
+    main()
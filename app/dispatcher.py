@@ -0,0 +1,46 @@
+"""Standalone dispatcher process: ``python -m app.dispatcher``.
+
+Owns everything the API workers otherwise run in-process: the due-reminder heap,
+the fallback scan, the delivery pool, the outcome outbox and the nightly
+retention job. Run the API with ``RUN_SCHEDULER_IN_API=false`` so that only this
+process (or a few of them; leases keep them from double-sending) dispatches.
+
+API writes stamp ``updated_ts``; the dispatcher follows that change feed every
+``DISPATCH_WATCH_SECONDS``, and with ``DISPATCH_NOTIFY=true`` on Postgres it is
+also woken by ``NOTIFY`` as soon as a write commits.
+"""
+import logging
+import signal
+import threading
+from app.config import settings
+from app.utils import metrics
+from app.utils.logging import configure_logging
+
+configure_logging(settings.LOG_LEVEL, queue_size=settings.LOG_QUEUE_SIZE, rate_limits=settings.LOG_RATE_LIMITS)
+
+from app.services import db
+from app.services.scheduler import scheduler_startup, scheduler_shutdown
+
+log = logging.getLogger(__name__)
+
+
+def main():
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    if settings.DISPATCHER_METRICS_PORT:
+        metrics.serve(settings.DISPATCHER_METRICS_PORT)
+    scheduler_startup()
+    log.info("dispatcher started", extra={"metrics_port": settings.DISPATCHER_METRICS_PORT or None})
+    try:
+        while not stop.wait(1.0):
+            pass
+    finally:
+        log.info("dispatcher stopping")
+        scheduler_shutdown()
+        db.dispose()
+        metrics.mark_process_dead()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,31 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+import time
 from starlette.responses import Response
 from app.config import settings
 
-from app.routes import reminders
+from app.routes import admin, reminders
+from app.services import async_db, db
 from app.services.scheduler import scheduler_startup, scheduler_shutdown
+from app.utils import metrics as prom
 from app.utils.logging import configure_logging, set_request_id
 from uuid import uuid4
 
-configure_logging(settings.LOG_LEVEL)
-
-REQUESTS = Counter("http_requests_total", "Total HTTP requests", ["method", "path", "status"])
-LATENCY = Histogram("http_request_duration_seconds", "Request latency", ["method", "path"])
+configure_logging(settings.LOG_LEVEL, queue_size=settings.LOG_QUEUE_SIZE, rate_limits=settings.LOG_RATE_LIMITS)
 
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    scheduler_startup()
+    # With RUN_SCHEDULER_IN_API=false a separate `python -m app.dispatcher` does the sending.
+    if settings.RUN_SCHEDULER_IN_API:
+        scheduler_startup()
     yield
-    scheduler_shutdown()
+    if settings.RUN_SCHEDULER_IN_API:
+        scheduler_shutdown()
+    await async_db.dispose()
+    db.dispose()
+    prom.mark_process_dead()
 
 app = FastAPI(
     title="Healthcare Reminders & Alerts",
@@ -29,6 +34,7 @@ app = FastAPI(
     openapi_tags=[
         {"name": "auth", "description": "Authentication operations"},
         {"name": "reminders", "description": "Reminder operations"},
+        {"name": "admin", "description": "Operational endpoints (admin only)"},
     ],
     openapi_version="3.1.0",
 )
@@ -91,10 +97,13 @@ async def add_request_id_and_metrics(request: Request, call_next):
     rid = request.headers.get("X-Request-ID") or str(uuid4())
     set_request_id(rid)
     method = request.method
-    path = request.url.path
-    with LATENCY.labels(method, path).time():
-        response = await call_next(request)
-    REQUESTS.labels(method, path, str(response.status_code)).inc()
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by the matched route template so /reminders/<id> stays one series.
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or "<unmatched>"
+    prom.LATENCY.labels(method, path).observe(time.perf_counter() - start)
+    prom.REQUESTS.labels(method, path, str(response.status_code)).inc()
     response.headers["X-Request-ID"] = rid
     return response
 
@@ -104,6 +113,8 @@ def home():
 
 @app.get("/metrics")
 def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    payload, content_type = prom.render()
+    return Response(payload, media_type=content_type)
 
-app.include_router(reminders.router, prefix="", tags=["reminders"])
\ No newline at end of file
+app.include_router(reminders.router, prefix="", tags=["reminders"])
+app.include_router(admin.router, prefix="", tags=["admin"])
\ No newline at end of file
@@ -0,0 +1,148 @@
+import time
+from typing import Any, Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import PlainTextResponse, StreamingResponse
+from app.config import settings
+from app.schemas.reminder import Method, TemplateIn, TemplateOut
+from app.services import async_db, templates
+from app.services.db import _OUT_COLUMNS
+from app.utils import export, profiler
+from app.utils.responses import FastJSONResponse
+from app.utils.security import User, require_admin
+from app.utils.time import epoch_ms_to_iso, iso_to_epoch_ms
+
+router = APIRouter()
+
+_EXPORT_FIELDS = [c.key for c in _OUT_COLUMNS]
+_EXPORT_MEDIA = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get(
+    "/admin/profile",
+    description=(
+        "Sample all thread stacks of this worker for `seconds` and return folded stacks "
+        "(flamegraph.pl / speedscope) or a JSON summary of the hottest frames. Path: /admin/profile"
+    ),
+)
+async def profile(
+    seconds: float = Query(5.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    format: Literal["collapsed", "json"] = Query("collapsed"),
+    admin: User = Depends(require_admin),
+):
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"seconds must be <= {settings.PROFILER_MAX_SECONDS}")
+    try:
+        # Sample from a worker thread so the event loop itself shows up in the profile.
+        stacks = await run_in_threadpool(profiler.sample, seconds, interval_ms / 1000)
+    except profiler.ProfilerBusy:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    if format == "json":
+        return FastJSONResponse(profiler.summary(stacks))
+    return PlainTextResponse(profiler.collapsed(stacks))
+
+
+
+@router.get(
+    "/admin/reminders/export",
+    description=(
+        "Stream all reminders matching the filters as NDJSON or CSV, oldest first. Rows are read "
+        "through a server-side cursor and written as they arrive, so memory stays flat for any "
+        "export size. Path: /admin/reminders/export"
+    ),
+)
+async def export_reminders(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    user_id: Optional[str] = Query(None),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    method: Optional[Method] = Query(None),
+    created_after: Optional[str] = Query(None, description="ISO 8601; created_at >= this"),
+    created_before: Optional[str] = Query(None, description="ISO 8601; created_at < this"),
+    delivery_after: Optional[str] = Query(None, description="ISO 8601; delivery_time >= this"),
+    delivery_before: Optional[str] = Query(None, description="ISO 8601; delivery_time < this"),
+    admin: User = Depends(require_admin),
+):
+    try:
+        bounds = {
+            name: iso_to_epoch_ms(value) if value else None
+            for name, value in (
+                ("created_after", created_after),
+                ("created_before", created_before),
+                ("delivery_after", delivery_after),
+                ("delivery_before", delivery_before),
+            )
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    batches = async_db.stream_reminders(
+        settings.EXPORT_BATCH_SIZE, user_id=user_id, status=status_filter, method=method, **bounds
+    )
+
+    async def body():
+        header = True
+        async for rows in batches:
+            if format == "ndjson":
+                yield export.ndjson(rows)
+            else:
+                yield export.csv_rows(rows, _EXPORT_FIELDS, header=header)
+                header = False
+        if header and format == "csv":
+            yield export.csv_rows([], _EXPORT_FIELDS, header=True)
+
+    filename = f"reminders-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=_EXPORT_MEDIA[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _template_out(tpl: templates.Template) -> Dict[str, Any]:
+    return {
+        "id": tpl.id,
+        "title": tpl.title,
+        "body": tpl.body,
+        "variables": sorted(tpl.variables),
+        "updated_at": epoch_ms_to_iso(tpl.updated_ts),
+    }
+
+
+@router.get(
+    "/admin/templates",
+    response_model=List[TemplateOut],
+    description="List message templates. Path: /admin/templates",
+)
+async def list_templates(admin: User = Depends(require_admin)):
+    rows = await async_db.list_templates()
+    return FastJSONResponse([_template_out(templates.Template(r["id"], r["title"], r["body"], r["updated_ts"])) for r in rows])
+
+
+@router.get(
+    "/admin/templates/{template_id}",
+    response_model=TemplateOut,
+    description="Get one message template. Path: /admin/templates/{template_id}",
+)
+async def get_template(template_id: str, admin: User = Depends(require_admin)):
+    tpl = (await templates.get_many_async([template_id])).get(template_id)
+    if tpl is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    return FastJSONResponse(_template_out(tpl))
+
+
+@router.put(
+    "/admin/templates/{template_id}",
+    response_model=TemplateOut,
+    description=(
+        "Create or replace a message template. Reminders reference it with "
+        "`reminder_metadata.template_id` and supply `reminder_metadata.vars`. Path: /admin/templates/{template_id}"
+    ),
+)
+async def put_template(template_id: str, payload: TemplateIn, admin: User = Depends(require_admin)):
+    try:
+        templates.Template(template_id, payload.title, payload.body)
+    except templates.TemplateError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    row = await async_db.upsert_template(template_id, payload.title, payload.body)
+    templates.invalidate(template_id)
+    return FastJSONResponse(_template_out(templates.Template(row["id"], row["title"], row["body"], row["updated_ts"])))
@@ -1,17 +1,34 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Header, Request, Query, status
 from app.schemas.reminder import (
     ReminderCreate,
     ReminderCreateRequest,
     ReminderOut,
+    ReminderPageOut,
+    OccurrenceOut,
+    AttemptOut,
     CancelOut,
     ReminderUpdate,
+    ReminderBatchRequest,
+    ReminderBatchOut,
+    Method,
 )
-from app.services import scheduler, db
+from pydantic import ValidationError
+from app.services import scheduler, async_db, templates
+from app.utils.responses import FastJSONResponse
 from app.utils.security import get_current_user, verify_hmac_signature, User
+from app.utils.time import iso_to_epoch_ms
 
 router = APIRouter()
 
+
+async def _create(data: ReminderCreate):
+    try:
+        rec = await scheduler.create_reminder_async(data)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return (await templates.annotate_async([dict(rec)]))[0]
+
 # -----------------------------
 # Create a reminder (normal user)
 # -----------------------------
@@ -20,9 +37,9 @@ router = APIRouter()
     response_model=ReminderOut,
     description="Create a new reminder for the authenticated user. Path: /reminders"
 )
-def create_reminder(payload: ReminderCreateRequest, user: User = Depends(get_current_user)):
+async def create_reminder(payload: ReminderCreateRequest, user: User = Depends(get_current_user)):
     data = ReminderCreate(**payload.model_dump(), user_id=user.id)
-    return scheduler.create_reminder(data)
+    return await _create(data)
 
 
 # -----------------------------
@@ -35,13 +52,67 @@ from app.utils.security import require_admin
     response_model=ReminderOut,
     description="Admin creates a reminder for a specific user. Path: /admin/users/{uid}/reminders"
 )
-def admin_create_reminder(
+async def admin_create_reminder(
     uid: str,
     payload: ReminderCreateRequest,
     admin: User = Depends(require_admin)   #  Now it will only be accessible by admin
 ):
     data = ReminderCreate(**payload.model_dump(), user_id=uid)
-    return scheduler.create_reminder(data)
+    return await _create(data)
+
+
+# -----------------------------
+# Bulk create reminders
+# -----------------------------
+def _batch_out(results):
+    created = sum(1 for r in results if r["ok"])
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}" for err in e.errors())
+
+
+async def _create_batch(raw_items: List[Dict[str, Any]], user_id: str):
+    """Validate items one by one and create the valid ones; invalid items become failed results."""
+    results: List[Dict[str, Any]] = []
+    items: List[ReminderCreate] = []
+    positions: List[int] = []
+    for i, raw in enumerate(raw_items):
+        try:
+            items.append(ReminderCreate(**ReminderCreateRequest.model_validate(raw).model_dump(), user_id=user_id))
+        except ValidationError as e:
+            results.append({"index": i, "ok": False, "reminder": None, "error": _validation_error(e)})
+            continue
+        positions.append(i)
+    if items:
+        for r in await scheduler.create_reminders_async(items):
+            results.append({**r, "index": positions[r["index"]]})
+    results.sort(key=lambda r: r["index"])
+    await templates.annotate_async([r["reminder"] for r in results if r["ok"]])
+    return _batch_out(results)
+
+
+@router.post(
+    "/reminders/batch",
+    response_model=ReminderBatchOut,
+    description="Create many reminders for the authenticated user in one transaction. Path: /reminders/batch"
+)
+async def create_reminders_batch(payload: ReminderBatchRequest, user: User = Depends(get_current_user)):
+    return await _create_batch(payload.items, user.id)
+
+
+@router.post(
+    "/admin/users/{uid}/reminders/batch",
+    response_model=ReminderBatchOut,
+    description="Admin creates many reminders for a specific user in one transaction. Path: /admin/users/{uid}/reminders/batch"
+)
+async def admin_create_reminders_batch(
+    uid: str,
+    payload: ReminderBatchRequest,
+    admin: User = Depends(require_admin)
+):
+    return await _create_batch(payload.items, uid)
 
 
 
@@ -50,13 +121,22 @@ def admin_create_reminder(
 # -----------------------------
 @router.get(
     "/users/{uid}/reminders",
-    response_model=List[ReminderOut],
-    description="List reminders for a user. Path: /users/{uid}/reminders"
+    response_model=ReminderPageOut,
+    description=(
+        "List reminders for a user, newest first. Path: /users/{uid}/reminders. "
+        "When more results exist `next_cursor` is set (also sent as an `X-Next-Cursor` header); "
+        "pass it back as `cursor` to fetch the next page."
+    )
 )
-def list_reminders(
+async def list_reminders(
     uid: str,
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated; ignored when cursor is given"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    method: Optional[Method] = Query(None),
+    delivery_after: Optional[str] = Query(None, description="ISO 8601; delivery_time >= this"),
+    delivery_before: Optional[str] = Query(None, description="ISO 8601; delivery_time < this"),
     user: User = Depends(get_current_user)
 ):
     is_admin = user.role == "admin"
@@ -64,7 +144,24 @@ def list_reminders(
     if not is_admin and uid != user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
 
-    return db.list_reminders(uid, limit=limit, offset=offset, is_admin=is_admin)
+    try:
+        rows, next_cursor = await async_db.list_reminders(
+            uid,
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            status=status_filter,
+            method=method,
+            delivery_after=iso_to_epoch_ms(delivery_after) if delivery_after else None,
+            delivery_before=iso_to_epoch_ms(delivery_before) if delivery_before else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Rows are already ReminderOut-shaped; serialize them directly instead of re-validating.
+    response = FastJSONResponse({"items": await templates.annotate_async(rows), "next_cursor": next_cursor})
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 # -----------------------------
@@ -75,14 +172,14 @@ def list_reminders(
     response_model=CancelOut,
     description="Cancel a reminder by ID. Path: /reminders/{rem_id}/cancel"
 )
-def cancel_reminder(rem_id: str, user: User = Depends(get_current_user)):
-    reminder = db.get(rem_id)
+async def cancel_reminder(rem_id: str, user: User = Depends(get_current_user)):
+    reminder = await async_db.get(rem_id)
     if not reminder:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reminder not found")
 
     if user.role == "admin" or reminder["user_id"] == user.id:
         scheduler.remove_job_safe(rem_id)
-        db.update_status(rem_id, "cancelled")
+        await async_db.update_status(rem_id, "cancelled")
         return {"message": f"Reminder {rem_id} cancelled"}
 
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
@@ -111,7 +208,7 @@ async def webhook_trigger(
         raise HTTPException(status_code=400, detail="Invalid payload")
 
     payload.user_id = user.id
-    return scheduler.create_reminder(payload)
+    return await _create(payload)
 
 
 # -----------------------------
@@ -119,14 +216,17 @@ async def webhook_trigger(
 # -----------------------------
 
 @router.put("/reminders/{rem_id}", response_model=dict)
-def update_reminder(rem_id: str, payload: ReminderUpdate, user: User = Depends(get_current_user)):
-    reminder = db.get(rem_id)
+async def update_reminder(rem_id: str, payload: ReminderUpdate, user: User = Depends(get_current_user)):
+    reminder = await async_db.get(rem_id)
     if not reminder:
         raise HTTPException(status_code=404, detail="Reminder not found")
 
     if user.role == "admin" or reminder["user_id"] == user.id:
         updated_data = payload.model_dump(exclude_none=True)
-        db.update_reminder(rem_id, updated_data)
+        try:
+            await scheduler.update_reminder_async(rem_id, updated_data)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         return {"message": f"Reminder {rem_id} updated successfully",}
 
     raise HTTPException(status_code=403, detail="Not authorized")
@@ -135,11 +235,52 @@ def update_reminder(rem_id: str, payload: ReminderUpdate, user: User = Depends(g
 
 
 @router.get("/reminders/{rem_id}", response_model=ReminderOut)
-def get_reminder(rem_id: str, user: User = Depends(get_current_user)):
-    reminder = db.get(rem_id)
+async def get_reminder(rem_id: str, user: User = Depends(get_current_user)):
+    reminder = await async_db.get(rem_id)
     if not reminder:
         raise HTTPException(status_code=404, detail="Reminder not found")
     # Admin can view any reminder, users only their own
     if user.role == "admin" or reminder["user_id"] == user.id:
-        return reminder
-    raise HTTPException(status_code=403, detail="Not authorized")
\ No newline at end of file
+        return FastJSONResponse((await templates.annotate_async([reminder]))[0])
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+
+@router.get(
+    "/reminders/{rem_id}/occurrences",
+    response_model=List[OccurrenceOut],
+    description="Delivery history of a recurring reminder, newest first. Path: /reminders/{rem_id}/occurrences"
+)
+async def list_occurrences(
+    rem_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[str] = Query(None, description="ISO 8601; only occurrences scheduled before this"),
+    user: User = Depends(get_current_user)
+):
+    reminder = await async_db.get(rem_id)
+    if not reminder:
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    if user.role != "admin" and reminder["user_id"] != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    try:
+        before_ts = iso_to_epoch_ms(before) if before else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return FastJSONResponse(await async_db.list_occurrences(rem_id, limit=limit, before_ts=before_ts))
+
+
+@router.get(
+    "/reminders/{rem_id}/attempts",
+    response_model=List[AttemptOut],
+    description="Send attempts logged for a reminder, newest first. Path: /reminders/{rem_id}/attempts"
+)
+async def list_attempts(
+    rem_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    user: User = Depends(get_current_user)
+):
+    reminder = await async_db.get(rem_id)
+    if not reminder:
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    if user.role != "admin" and reminder["user_id"] != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return FastJSONResponse(await async_db.list_attempts(rem_id, limit=limit))
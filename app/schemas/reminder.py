@@ -1,20 +1,52 @@
-from typing import Any, Dict, Literal, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator, ValidationInfo
 from datetime import datetime, timezone
+from app.utils import recurrence as _recurrence
 
 Method = Literal["email", "sms"]
 
+# Delivery priority: higher is sent first when channels are saturated; low-priority
+# sends may be spread over DELIVERY_LOW_PRIORITY_TOLERANCE_SECONDS after their time.
+PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH, PRIORITY_CRITICAL = 0, 1, 2, 3
+
+
+def _check_iso(v: Optional[str], info: ValidationInfo) -> Optional[str]:
+    if v is None:
+        return v
+    try:
+        if v.endswith("Z"):
+            v = v.replace("Z", "+00:00")
+        dt = datetime.fromisoformat(v)
+        _ = dt.astimezone(timezone.utc)
+    except Exception as e:
+        raise ValueError(f"{info.field_name} must be ISO 8601") from e
+    return v
+
+
+def check_text(title: Optional[str], message: Optional[str], metadata: Optional[Dict[str, Any]]):
+    """A reminder needs its own title and message unless it references a template.
+
+    Also used on updates, against the stored reminder merged with the change.
+    """
+    metadata = metadata or {}
+    template_id = metadata.get("template_id")
+    if template_id is None:
+        if not title or not message:
+            raise ValueError("title and message are required unless reminder_metadata.template_id is set")
+    elif not isinstance(template_id, str) or not isinstance(metadata.get("vars", {}), dict):
+        raise ValueError("reminder_metadata.template_id must be a string and vars an object")
+
 class ReminderCreateRequest(BaseModel):
-    title: str = Field(
-        ...,
-        description="Title of the reminder",
+    title: Optional[str] = Field(
+        None,
+        description="Title of the reminder; optional with a template (overrides the template title)",
         min_length=1,
         max_length=120,
         json_schema_extra={"example": "Doctor Appointment"}
     )
-    message: str = Field(
-        ...,
-        description="Detailed message for the reminder",
+    message: Optional[str] = Field(
+        None,
+        description="Detailed message for the reminder; optional with a template (overrides the template body)",
         min_length=1,
         max_length=1000,
         json_schema_extra={"example": "You have a follow-up appointment tomorrow at 10 AM."}
@@ -36,21 +68,48 @@ class ReminderCreateRequest(BaseModel):
     )
     reminder_metadata: Dict[str, Any] = Field(
         default_factory=dict,
-        description="Additional metadata for the reminder",
+        description=(
+            "Additional metadata for the reminder. Set `template_id` (and `vars`) to render "
+            "a stored message template at send time instead of storing title/message"
+        ),
         json_schema_extra={"example": {"to": "patient@example.com"}}
     )
+    priority: int = Field(
+        default=PRIORITY_NORMAL,
+        ge=PRIORITY_LOW,
+        le=PRIORITY_CRITICAL,
+        description="0 low (may be sent a little late to smooth peaks), 1 normal, 2 high, 3 critical (e.g. medication alerts)",
+        json_schema_extra={"example": PRIORITY_NORMAL}
+    )
+    recurrence: Optional[str] = Field(
+        None,
+        description="Repeat on this cron schedule (minute hour day month weekday), evaluated in `timezone`; delivery_time is the series start",
+        max_length=120,
+        json_schema_extra={"example": "0 8 * * *"}
+    )
+    recurrence_end: Optional[str] = Field(
+        None,
+        description="No occurrences after this time (ISO 8601); open-ended when omitted",
+        json_schema_extra={"example": "2025-12-31T23:59:59Z"}
+    )
 
-    @field_validator("delivery_time")
+    @field_validator("delivery_time", "recurrence_end")
     @classmethod
-    def validate_iso(cls, v: str) -> str:
-        try:
-            if v.endswith("Z"):
-                v = v.replace("Z", "+00:00")
-            dt = datetime.fromisoformat(v)
-            _ = dt.astimezone(timezone.utc)
-        except Exception as e:
-            raise ValueError("delivery_time must be ISO 8601") from e
-        return v
+    def validate_iso(cls, v: Optional[str], info: ValidationInfo) -> Optional[str]:
+        return _check_iso(v, info)
+
+    @model_validator(mode="after")
+    def validate_text(self):
+        check_text(self.title, self.message, self.reminder_metadata)
+        return self
+
+    @model_validator(mode="after")
+    def validate_recurrence(self):
+        if self.recurrence is not None:
+            _recurrence.parse(self.recurrence, self.timezone)
+        elif self.recurrence_end is not None:
+            raise ValueError("recurrence_end requires recurrence")
+        return self
 
 
 # ✅ Internal schema (system uses this, includes user_id)
@@ -100,6 +159,23 @@ class ReminderUpdate(BaseModel):
         description="Updated additional metadata for the reminder",
         json_schema_extra={"example": {"to": "+1234567890"}}
     )
+    priority: Optional[int] = Field(
+        None,
+        ge=PRIORITY_LOW,
+        le=PRIORITY_CRITICAL,
+        description="Updated delivery priority",
+        json_schema_extra={"example": PRIORITY_HIGH}
+    )
+
+    @field_validator("delivery_time")
+    @classmethod
+    def validate_iso(cls, v: Optional[str], info: ValidationInfo) -> Optional[str]:
+        return _check_iso(v, info)
+
+
+class ReminderPreview(BaseModel):
+    title: str
+    message: str
 
 
 class ReminderOut(BaseModel):
@@ -111,13 +187,81 @@ class ReminderOut(BaseModel):
     method: str = Field(description="Delivery method (email/sms)")
     status: str = Field(
         description="Current status of the reminder",
-        examples=["scheduled", "sent", "failed", "cancelled"]
+        examples=["scheduled", "sending", "sent", "failed", "cancelled"]
     )
     reminder_metadata: Dict[str, Any] = Field(
         description="Additional metadata associated with the reminder"
     )
     created_at: str = Field(description="When the reminder was created")
+    priority: int = Field(PRIORITY_NORMAL, description="Delivery priority (0 low .. 3 critical)")
+    recurrence: Optional[str] = Field(None, description="Cron schedule for recurring reminders")
+    recurrence_end: Optional[str] = Field(None, description="When a recurring reminder stops")
+    template_id: Optional[str] = Field(None, description="Message template the text is rendered from at send time")
+    preview: Optional[ReminderPreview] = Field(
+        None, description="Templated reminders: the title and message as they would be sent now"
+    )
+
+
+class ReminderPageOut(BaseModel):
+    items: List[ReminderOut]
+    next_cursor: Optional[str] = Field(None, description="Pass back as `cursor` for the next page; null on the last page")
+
+
+class OccurrenceOut(BaseModel):
+    occurrence_time: str = Field(description="Scheduled time of this occurrence")
+    status: str = Field(description="Delivery outcome", examples=["sent", "failed"])
+    completed_at: str = Field(description="When the delivery attempt finished")
+
+
+class AttemptOut(BaseModel):
+    idempotency_key: str = Field(description="Unique key of this attempt: <reminder id>:<delivery_ts>:<attempt>")
+    attempt: int = Field(description="Attempt number within the delivery")
+    channel: str = Field(description="Delivery method used")
+    status: str = Field(description="Attempt outcome", examples=["sent", "failed", "error"])
+    error: Optional[str] = Field(None, description="Provider error for failed attempts")
+    occurrence_time: Optional[str] = Field(None, description="Scheduled time being delivered")
+    started_at: str = Field(description="When the attempt started")
+    finished_at: str = Field(description="When the attempt finished")
+
+
+class TemplateIn(BaseModel):
+    title: str = Field(..., min_length=1, max_length=120, description="Title with {variable} placeholders",
+                       json_schema_extra={"example": "Time for your {drug}"})
+    body: str = Field(..., min_length=1, max_length=1000, description="Message with {variable} placeholders",
+                      json_schema_extra={"example": "Hi {name}, please take {dose} of {drug} now."})
+
+
+class TemplateOut(BaseModel):
+    id: str = Field(description="Template id, referenced as reminder_metadata.template_id")
+    title: str
+    body: str
+    variables: List[str] = Field(description="Placeholders a reminder must supply in reminder_metadata.vars")
+    updated_at: str = Field(description="When the template last changed")
 
 
 class CancelOut(BaseModel):
     message: str
+
+
+class ReminderBatchRequest(BaseModel):
+    # Items are validated one by one (as ReminderCreateRequest) by the route, so a
+    # malformed item is reported in its result instead of rejecting the whole batch.
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        description="Reminders to create in a single transaction (each shaped like ReminderCreateRequest)",
+        min_length=1,
+        max_length=5000,
+    )
+
+
+class ReminderBatchItemResult(BaseModel):
+    index: int = Field(description="Position of the item in the submitted batch")
+    ok: bool = Field(description="Whether the reminder was created")
+    reminder: Optional[ReminderOut] = Field(None, description="Created reminder when ok")
+    error: Optional[str] = Field(None, description="Reason the item was rejected")
+
+
+class ReminderBatchOut(BaseModel):
+    created: int = Field(description="Number of reminders created")
+    failed: int = Field(description="Number of items rejected")
+    results: List[ReminderBatchItemResult]
@@ -0,0 +1,253 @@
+"""Async data access for the API routes.
+
+Mirrors the read/write helpers in ``db`` on an ``AsyncEngine`` (aiosqlite for
+SQLite, asyncpg for Postgres) so request handlers never hold a threadpool slot
+while waiting on the database. The scheduler keeps using the sync functions in
+``db``; both share the same models and schema setup. On a SQLite file the
+write helpers hand their statements to ``db.writer`` (group commit) and await
+the result, so API writes never compete with each other for the file lock.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from app.config import settings
+from app.services import db, sqlite
+from app.services.cache import reminders as _cache
+from app.services.db import (
+    DeliveryAttempt,
+    MessageTemplate,
+    Reminder,
+    ReminderOccurrence,
+    _OUT_COLUMNS,
+    _TEMPLATE_COLUMNS,
+    _change_notice,
+    _export_stmt,
+    _list_stmt,
+    _stamp,
+)
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.tracing import traced
+from app.utils.time import epoch_ms_to_iso, now_epoch_ms
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def _async_url(url: str):
+    u = make_url(url)
+    return u.set(drivername=_ASYNC_DRIVERS.get(u.get_backend_name(), u.drivername))
+
+def _create_engine() -> AsyncEngine:
+    url = _async_url(settings.DATABASE_URL)
+    kwargs: Dict[str, Any] = {"echo": False, "pool_pre_ping": True}
+    if sqlite.is_sqlite(url):
+        kwargs.update(sqlite.engine_kwargs(url))
+    elif url.database not in (None, "", ":memory:"):
+        kwargs.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    eng = create_async_engine(url, **kwargs)
+    if sqlite.is_sqlite(url):
+        sqlite.install(eng.sync_engine)
+    return eng
+
+engine = _create_engine()
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+async def _notify(s) -> None:
+    notice = _change_notice()
+    if notice is not None:
+        await s.execute(notice)
+
+@traced("async_db.insert_reminder")
+async def insert_reminder(rec: Dict[str, Any]) -> None:
+    if db.writer is not None:
+        await db.writer.run_async(db._insert_op([rec]))
+        _cache.delete(rec["id"])
+        return
+    async with Session() as s:
+        await s.execute(insert(Reminder), [_stamp(rec)])
+        await _notify(s)
+        await s.commit()
+    _cache.delete(rec["id"])
+
+@traced("async_db.insert_reminders")
+async def insert_reminders(recs: List[Dict[str, Any]]) -> None:
+    if not recs:
+        return
+    if db.writer is not None:
+        await db.writer.run_async(db._insert_op(recs))
+        _cache.delete_many(r["id"] for r in recs)
+        return
+    async with Session() as s:
+        await s.execute(insert(Reminder), [_stamp(r) for r in recs])
+        await _notify(s)
+        await s.commit()
+    _cache.delete_many(r["id"] for r in recs)
+
+@traced("async_db.update_status")
+async def update_status(rem_id: str, status: str) -> None:
+    if db.writer is not None:
+        await db.writer.run_async(db._status_op(rem_id, status))
+        _cache.delete(rem_id)
+        return
+    async with Session() as s:
+        await s.execute(update(Reminder).where(Reminder.id == rem_id).values(status=status, updated_ts=now_epoch_ms()))
+        await _notify(s)
+        await s.commit()
+    _cache.delete(rem_id)
+
+@traced("async_db.get")
+async def get(rem_id: str) -> Optional[Dict[str, Any]]:
+    cached = _cache.get(rem_id)
+    if cached is not None:
+        return dict(cached)
+    since = _cache.generation()
+    async with Session() as s:
+        row = (await s.execute(select(*_OUT_COLUMNS).where(Reminder.id == rem_id))).first()
+    if row is None:
+        return None
+    rec = dict(row._mapping)
+    _cache.set_if_fresh(rem_id, rec, since)
+    return dict(rec)
+
+@traced("async_db.list_reminders")
+async def list_reminders(
+    user_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    **filters: Any,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of a user's reminders plus the cursor for the next page (None on the last page).
+
+    Raises ``ValueError`` for a malformed cursor.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    stmt = _list_stmt(user_id, limit + 1, cursor=after, offset=offset, **filters)
+    async with Session() as s:
+        rows = [dict(r._mapping) for r in await s.execute(stmt)]
+    keys = [r.pop("sort_ts") for r in rows]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(keys[limit - 1], rows[-1]["id"])
+
+@traced("async_db.update_reminder")
+async def update_reminder(rem_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if db.writer is not None:
+        rec = await db.writer.run_async(db._update_op(rem_id, fields))
+    else:
+        async with Session() as s:
+            stmt = (
+                update(Reminder)
+                .where(Reminder.id == rem_id)
+                .values(**_stamp(fields))
+                .returning(*_OUT_COLUMNS)
+            )
+            row = (await s.execute(stmt)).first()
+            await _notify(s)
+            await s.commit()
+        rec = dict(row._mapping) if row is not None else None
+    # Invalidate rather than cache the returned row: concurrent updates may
+    # commit in a different order than they reach this line.
+    _cache.delete(rem_id)
+    return rec
+
+async def stream_reminders(batch_size: int = 1000, **filters: Any) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield every reminder matching ``filters`` (see ``db._export_stmt``) in batches of ``batch_size``.
+
+    The query runs on a server-side cursor (``stream_results``), so only one batch
+    is held in memory at a time however many rows match. The connection stays
+    checked out until the iterator is exhausted or closed.
+    """
+    stmt = _export_stmt(**filters).execution_options(yield_per=batch_size)
+    async with Session() as s:
+        result = await s.stream(stmt)
+        async for part in result.partitions():
+            yield [dict(r._mapping) for r in part]
+
+@traced("async_db.list_occurrences")
+async def list_occurrences(rem_id: str, limit: int = 100, before_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Past occurrences of a recurring reminder, newest first."""
+    stmt = (
+        select(ReminderOccurrence.occurrence_ts, ReminderOccurrence.status, ReminderOccurrence.completed_ts)
+        .where(ReminderOccurrence.reminder_id == rem_id)
+        .order_by(ReminderOccurrence.occurrence_ts.desc())
+        .limit(limit)
+    )
+    if before_ts is not None:
+        stmt = stmt.where(ReminderOccurrence.occurrence_ts < before_ts)
+    async with Session() as s:
+        rows = (await s.execute(stmt)).all()
+    return [
+        {"occurrence_time": epoch_ms_to_iso(r.occurrence_ts), "status": r.status, "completed_at": epoch_ms_to_iso(r.completed_ts)}
+        for r in rows
+    ]
+
+@traced("async_db.list_attempts")
+async def list_attempts(rem_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+    """Send attempts logged for a reminder, newest first."""
+    stmt = (
+        select(
+            DeliveryAttempt.idempotency_key,
+            DeliveryAttempt.attempt,
+            DeliveryAttempt.channel,
+            DeliveryAttempt.status,
+            DeliveryAttempt.error,
+            DeliveryAttempt.occurrence_ts,
+            DeliveryAttempt.started_ts,
+            DeliveryAttempt.finished_ts,
+        )
+        .where(DeliveryAttempt.reminder_id == rem_id)
+        .order_by(DeliveryAttempt.started_ts.desc())
+        .limit(limit)
+    )
+    async with Session() as s:
+        rows = (await s.execute(stmt)).all()
+    return [
+        {
+            "idempotency_key": r.idempotency_key,
+            "attempt": r.attempt,
+            "channel": r.channel,
+            "status": r.status,
+            "error": r.error,
+            "occurrence_time": epoch_ms_to_iso(r.occurrence_ts) if r.occurrence_ts else None,
+            "started_at": epoch_ms_to_iso(r.started_ts),
+            "finished_at": epoch_ms_to_iso(r.finished_ts),
+        }
+        for r in rows
+    ]
+
+@traced("async_db.get_templates")
+async def get_templates(template_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not template_ids:
+        return {}
+    async with Session() as s:
+        rows = (await s.execute(select(*_TEMPLATE_COLUMNS).where(MessageTemplate.id.in_(template_ids)))).all()
+    return {r.id: dict(r._mapping) for r in rows}
+
+@traced("async_db.list_templates")
+async def list_templates() -> List[Dict[str, Any]]:
+    async with Session() as s:
+        rows = (await s.execute(select(*_TEMPLATE_COLUMNS).order_by(MessageTemplate.id))).all()
+    return [dict(r._mapping) for r in rows]
+
+@traced("async_db.upsert_template")
+async def upsert_template(template_id: str, title: str, body: str) -> Dict[str, Any]:
+    row = {"id": template_id, "title": title, "body": body, "updated_ts": now_epoch_ms()}
+    if db.writer is not None:
+        await db.writer.run_async(db._template_op(row))
+        return row
+    async with Session() as s:
+        await s.execute(db._template_stmt(row))
+        await s.commit()
+    return row
+
+async def dispose():
+    await engine.dispose()
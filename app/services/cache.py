@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.config import settings
+from app.utils import metrics
+
+
+class CacheBackend:
+    """Key/value cache interface.
+
+    The in-process ``LRUCache`` is the default; a shared backend (Redis, memcached)
+    only needs to implement these methods and be registered with ``register_backend``.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.delete(key)
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def generation(self) -> int:
+        """Token to take *before* loading a value that will go to ``set_if_fresh``."""
+        return 0
+
+    def set_if_fresh(self, key: str, value: Any, since: int, ttl: Optional[float] = None) -> bool:
+        """``set`` unless ``key`` was invalidated after ``since`` (a ``generation()`` token).
+
+        Read-through callers use it so a row loaded just before a concurrent write's
+        invalidation is not cached afterwards. Backends that cannot tell just set.
+        """
+        self.set(key, value, ttl)
+        return True
+
+
+class NullCache(CacheBackend):
+    def __init__(self, name: str, **_: Any):
+        self.name = name
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    def set_if_fresh(self, key: str, value: Any, since: int, ttl: Optional[float] = None) -> bool:
+        return False
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class LRUCache(CacheBackend):
+    """Thread-safe bounded LRU with a default TTL and optional per-entry TTL."""
+
+    def __init__(self, name: str, max_size: int = 10000, ttl: float = 30.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Invalidation generations for set_if_fresh: the generation of each key's last
+        # delete (bounded like the data; anything older than _floor counts as invalidated).
+        self._gen = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self._hits = metrics.CACHE_HITS.labels(name)
+        self._misses = metrics.CACHE_MISSES.labels(name)
+        self._evictions = metrics.CACHE_EVICTIONS.labels(name)
+        self._size = metrics.CACHE_SIZE.labels(name)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                del self._data[key]
+                self._size.set(len(self._data))
+        self._misses.inc()
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            evicted = self._store(key, value, ttl)
+        if evicted:
+            self._evictions.inc(evicted)
+
+    def set_if_fresh(self, key: str, value: Any, since: int, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if since < self._floor or self._invalidated.get(key, 0) > since:
+                return False
+            evicted = self._store(key, value, ttl)
+        if evicted:
+            self._evictions.inc(evicted)
+        return True
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]) -> int:
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        evicted = 0
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            evicted += 1
+        self._size.set(len(self._data))
+        return evicted
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._gen
+
+    def _invalidate(self, key: str):
+        self._data.pop(key, None)
+        self._gen += 1
+        self._invalidated[key] = self._gen
+        self._invalidated.move_to_end(key)
+        if len(self._invalidated) > self.max_size:
+            _, self._floor = self._invalidated.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._invalidate(key)
+            self._size.set(len(self._data))
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._invalidate(key)
+            self._size.set(len(self._data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._invalidated.clear()
+            self._gen += 1
+            self._floor = self._gen
+            self._size.set(0)
+
+
+_BACKENDS: Dict[str, Callable[..., CacheBackend]] = {
+    "memory": lambda name, max_size, ttl: LRUCache(name, max_size=max_size, ttl=ttl),
+    "none": lambda name, **_: NullCache(name),
+}
+
+
+def register_backend(kind: str, factory: Callable[..., CacheBackend]):
+    """Make ``kind`` selectable via ``REMINDER_CACHE_BACKEND``; ``factory(name, max_size=, ttl=)``."""
+    _BACKENDS[kind] = factory
+
+
+def build(name: str, kind: str, max_size: int, ttl: float) -> CacheBackend:
+    try:
+        factory = _BACKENDS[kind]
+    except KeyError:
+        raise ValueError(f"unknown cache backend {kind!r}") from None
+    return factory(name, max_size=max_size, ttl=ttl)
+
+
+# Reminder rows by id, shared by the sync and async data layers.
+reminders = build(
+    "reminders",
+    settings.REMINDER_CACHE_BACKEND,
+    max_size=settings.REMINDER_CACHE_SIZE,
+    ttl=settings.REMINDER_CACHE_TTL_SECONDS,
+)
@@ -1,15 +1,36 @@
 
-from typing import Any, Dict, List, Optional
-from sqlalchemy import create_engine, Text, String, select, update, delete
+import logging
+import threading
+import time
+from datetime import datetime
+from select import select as select_fds
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import create_engine, case, func, inspect, literal, text, and_, or_, BigInteger, Index, Integer, Text, String, select, insert, update, delete, tuple_
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, Session
 from sqlalchemy.types import JSON as SA_JSON
 from app.config import settings
+from app.services import sqlite
+from app.services.cache import reminders as _cache
+from app.services.group_commit import GroupCommitWriter
+from app.utils.tracing import traced
+from app.utils.time import epoch_ms_to_iso, iso_to_epoch_ms, now_epoch_ms, to_epoch_ms
+
+log = logging.getLogger(__name__)
 
 class Base(DeclarativeBase):
     pass
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        # Keyset pagination of a user's reminders, newest first.
+        Index("ix_reminders_user_created_ts", "user_id", "created_ts", "id"),
+        # Due scans: status = 'scheduled' AND delivery_ts <= now.
+        Index("ix_reminders_status_delivery_ts", "status", "delivery_ts"),
+        # Change feed read by a standalone dispatcher (fetch_changed).
+        Index("ix_reminders_updated_ts", "updated_ts", "id"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True)
     user_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
@@ -20,80 +41,695 @@ class Reminder(Base):
     reminder_metadata: Mapped[Dict[str, Any]] = mapped_column(SA_JSON, default=dict)
     created_at: Mapped[str] = mapped_column(String, nullable=False, index=True)
     status: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    lease_owner: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Epoch ms (UTC) the lease runs out; compared numerically like delivery_ts. Tables
+    # created before it still carry an unused lease_expires_at ISO string column.
+    lease_expires_ts: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    # Epoch milliseconds (UTC) mirrors of delivery_time/created_at. The ISO strings
+    # stay for API output; every range query runs on these integer columns.
+    delivery_ts: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    created_ts: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True, index=True)
+    # Recurring reminders: crontab evaluated in ``timezone``. delivery_time/delivery_ts
+    # always hold the next occurrence; past ones live in reminder_occurrences.
+    recurrence: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    recurrence_end: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Epoch ms of the last API-side write (create, update, cancel); the dispatcher
+    # polls it as a watermark to pick up changes made by other processes.
+    updated_ts: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    # 0 low .. 3 critical (schemas.reminder.PRIORITY_*); claims and the delivery
+    # queues serve higher priorities first.
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("1"))
+
+class DeliveryAttempt(Base):
+    """Append-only log of send attempts, keyed ``<reminder id>:<delivery_ts>:<attempt>``."""
+    __tablename__ = "delivery_attempts"
+    idempotency_key: Mapped[str] = mapped_column(String, primary_key=True)
+    reminder_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    occurrence_ts: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    attempt: Mapped[int] = mapped_column(Integer, nullable=False)
+    channel: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    node: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    started_ts: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    finished_ts: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+class ReminderOccurrence(Base):
+    """Outcome of one fired occurrence of a recurring reminder."""
+    __tablename__ = "reminder_occurrences"
+    reminder_id: Mapped[str] = mapped_column(String, primary_key=True)
+    occurrence_ts: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    status: Mapped[str] = mapped_column(String, nullable=False)
+    completed_ts: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+class MessageTemplate(Base):
+    """Named title/body text with ``{variable}`` placeholders, referenced by
+    ``reminder_metadata.template_id`` and rendered at send time (services.templates)."""
+    __tablename__ = "message_templates"
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    title: Mapped[str] = mapped_column(String, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_ts: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+_TEMPLATE_COLUMNS = (MessageTemplate.id, MessageTemplate.title, MessageTemplate.body, MessageTemplate.updated_ts)
+
+def _create_engine():
+    url = make_url(settings.DATABASE_URL)
+    eng = create_engine(url, echo=False, future=True, **sqlite.engine_kwargs(url))
+    if sqlite.is_sqlite(url):
+        sqlite.install(eng)
+    return eng
+
+engine = _create_engine()
+# SQLite files take every write (API, dispatcher, outbox, retention) through one
+# group-commit thread, so no two transactions compete for the file lock (see _write).
+writer: Optional[GroupCommitWriter] = None
+if settings.SQLITE_GROUP_COMMIT and sqlite.is_sqlite(engine.url) and sqlite.is_file(engine.url):
+    writer = GroupCommitWriter(
+        engine,
+        window=settings.SQLITE_GROUP_COMMIT_WINDOW_MS / 1000,
+        max_batch=settings.SQLITE_GROUP_COMMIT_MAX_BATCH,
+    )
+
+def _migrate_schema():
+    """Add columns and indexes introduced after a table was first created (additive only)."""
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing]
+        with engine.begin() as conn:
+            for col in missing:
+                # Existing rows take the server default; the column stays nullable here
+                # because SQLite cannot add a NOT NULL column to a populated table.
+                default = f" DEFAULT {col.server_default.arg.text}" if col.server_default is not None else ""
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}{default}"))
+            for idx in table.indexes:
+                idx.create(conn, checkfirst=True)
 
-engine = create_engine(settings.DATABASE_URL, echo=False, future=True)
 Base.metadata.create_all(engine)
+_migrate_schema()
 
-def insert_reminder(rec: Dict[str, Any]) -> None:
+_COLUMNS = tuple(Reminder.__table__.c)
+# What API responses and the cache carry (the ReminderOut fields); the lean read
+# path selects only these as Core rows instead of loading ORM objects.
+_OUT_COLUMNS = (
+    Reminder.id,
+    Reminder.user_id,
+    Reminder.title,
+    Reminder.message,
+    Reminder.delivery_time,
+    Reminder.method,
+    Reminder.status,
+    Reminder.reminder_metadata,
+    Reminder.created_at,
+    Reminder.priority,
+    Reminder.recurrence,
+    Reminder.recurrence_end,
+)
+
+def _has_unstamped_rows() -> bool:
     with Session(engine) as s:
-        s.add(Reminder(**rec))
-        s.commit()
+        unstamped = or_(Reminder.delivery_ts.is_(None), Reminder.created_ts.is_(None))
+        return s.execute(select(Reminder.id).where(unstamped).limit(1)).first() is not None
 
-def update_status(rem_id: str, status: str) -> None:
+# True until the integer columns of pre-existing rows are filled; while set, range
+# queries also match legacy rows by their ISO strings. Read it via backfill_pending().
+_backfill_pending = _has_unstamped_rows()
+_backfill_checked = time.monotonic()
+
+def backfill_pending() -> bool:
+    """Whether legacy rows may still lack ``delivery_ts``/``created_ts``.
+
+    The backfill runs in one process (the scheduler's), so others re-check the
+    table at most every ``BACKFILL_RECHECK_SECONDS`` while the flag is set. Once
+    clear it stays clear: new rows are always stamped.
+    """
+    global _backfill_pending, _backfill_checked
+    if _backfill_pending and time.monotonic() - _backfill_checked >= settings.BACKFILL_RECHECK_SECONDS:
+        _backfill_checked = time.monotonic()
+        _backfill_pending = _has_unstamped_rows()
+    return _backfill_pending
+
+CHANGES_CHANNEL = "reminder_changes"
+
+def _stamp(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of ``rec`` with the epoch-ms columns derived from its ISO timestamps and ``updated_ts`` set."""
+    out = dict(rec)
+    out["updated_ts"] = now_epoch_ms()
+    if "delivery_time" in rec and rec.get("delivery_ts") is None:
+        out["delivery_ts"] = iso_to_epoch_ms(rec["delivery_time"])
+    if "created_at" in rec and rec.get("created_ts") is None:
+        out["created_ts"] = iso_to_epoch_ms(rec["created_at"])
+    return out
+
+def _change_notice():
+    """``pg_notify`` statement to run inside a write transaction when DISPATCH_NOTIFY is on (Postgres only).
+
+    Postgres delivers it on commit, so a listening dispatcher wakes exactly when the
+    change becomes visible; the payload is empty because the dispatcher re-reads
+    the change feed anyway.
+    """
+    if settings.DISPATCH_NOTIFY and engine.dialect.name == "postgresql":
+        return text(f"SELECT pg_notify('{CHANGES_CHANNEL}', '')")
+    return None
+
+def _notify(s: Session):
+    notice = _change_notice()
+    if notice is not None:
+        s.execute(notice)
+
+def _created_key():
+    """Sort key of the newest-first listing. Until the backfill is done, unstamped
+    legacy rows sort as oldest (0) instead of landing wherever the backend puts NULLs."""
+    if backfill_pending():
+        return func.coalesce(Reminder.created_ts, 0)
+    return Reminder.created_ts
+
+def _due_before(upto_ms: int):
+    clause = Reminder.delivery_ts <= upto_ms
+    if backfill_pending():
+        legacy = and_(Reminder.delivery_ts.is_(None), Reminder.delivery_time <= epoch_ms_to_iso(upto_ms))
+        clause = or_(clause, legacy)
+    return clause
+
+@traced("db.backfill_timestamps")
+def backfill_timestamps(batch_size: int = 1000, pause_seconds: float = 0.0) -> int:
+    """Fill ``delivery_ts``/``created_ts`` for rows written before those columns existed.
+
+    Walks the table by primary key in short transactions so it can run alongside
+    live traffic. Rows whose ISO strings cannot be parsed are logged and skipped.
+    """
+    global _backfill_pending
+    done, skipped, after_id = 0, 0, ""
+    while True:
+        with Session(engine) as s:
+            rows = s.execute(
+                select(Reminder.id, Reminder.delivery_time, Reminder.created_at)
+                .where(Reminder.id > after_id, or_(Reminder.delivery_ts.is_(None), Reminder.created_ts.is_(None)))
+                .order_by(Reminder.id)
+                .limit(batch_size)
+            ).all()
+        if not rows:
+            break
+        params = []
+        for r in rows:
+            try:
+                params.append({"id": r.id, "delivery_ts": iso_to_epoch_ms(r.delivery_time), "created_ts": iso_to_epoch_ms(r.created_at)})
+            except ValueError:
+                skipped += 1
+                log.warning("cannot backfill timestamps for reminder %s", r.id)
+        if params:
+            _write(lambda s: s.execute(update(Reminder), params))
+        done += len(params)
+        after_id = rows[-1].id
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    if not skipped:
+        _backfill_pending = False
+    return done
+
+# Write operations are functions of a Session so they can run either in their
+# own transaction or batched by the group-commit writer (see _write).
+def _insert_op(recs: List[Dict[str, Any]]):
+    rows = [_stamp(r) for r in recs]
+    def op(s: Session) -> None:
+        s.execute(insert(Reminder), rows)
+        _notify(s)
+    return op
+
+def _status_op(rem_id: str, status: str):
+    def op(s: Session) -> None:
+        s.execute(update(Reminder).where(Reminder.id == rem_id).values(status=status, updated_ts=now_epoch_ms()))
+        _notify(s)
+    return op
+
+def _update_op(rem_id: str, fields: Dict[str, Any]):
+    values = _stamp(fields)
+    def op(s: Session) -> Optional[Dict[str, Any]]:
+        row = s.execute(update(Reminder).where(Reminder.id == rem_id).values(**values).returning(*_OUT_COLUMNS)).first()
+        _notify(s)
+        return dict(row._mapping) if row is not None else None
+    return op
+
+def _template_stmt(row: Dict[str, Any]):
+    stmt = _upsert(MessageTemplate).values(**row)
+    return stmt.on_conflict_do_update(index_elements=[MessageTemplate.id], set_={k: stmt.excluded[k] for k in ("title", "body", "updated_ts")})
+
+def _template_op(row: Dict[str, Any]):
+    stmt = _template_stmt(row)
+    def op(s: Session) -> None:
+        s.execute(stmt)
+    return op
+
+def _write(op):
+    """Run ``op(session)`` and commit: through the group-commit writer when there is one."""
+    if writer is not None:
+        return writer.run(op)
     with Session(engine) as s:
-        s.execute(update(Reminder).where(Reminder.id==rem_id).values(status=status))
+        result = op(s)
         s.commit()
+    return result
+
+def dispose():
+    """Stop the group-commit writer (committing what it holds) and close pooled connections."""
+    if writer is not None:
+        writer.stop()
+    engine.dispose()
+
+@traced("db.insert_reminder")
+def insert_reminder(rec: Dict[str, Any]) -> None:
+    _write(_insert_op([rec]))
+    _cache.delete(rec["id"])
 
+@traced("db.insert_reminders")
+def insert_reminders(recs: List[Dict[str, Any]]) -> None:
+    """Insert many reminders in a single transaction using an executemany bulk insert."""
+    if not recs:
+        return
+    _write(_insert_op(recs))
+    _cache.delete_many(r["id"] for r in recs)
+
+@traced("db.update_status")
+def update_status(rem_id: str, status: str) -> None:
+    _write(_status_op(rem_id, status))
+    _cache.delete(rem_id)
+
+@traced("db.get")
 def get(rem_id: str) -> Optional[Dict[str, Any]]:
+    cached = _cache.get(rem_id)
+    if cached is not None:
+        return dict(cached)
+    since = _cache.generation()
     with Session(engine) as s:
-        obj = s.get(Reminder, rem_id)
-        return None if obj is None else obj.__dict__ | {}
+        row = s.execute(select(*_OUT_COLUMNS).where(Reminder.id == rem_id)).first()
+    if row is None:
+        return None
+    rec = dict(row._mapping)
+    _cache.set_if_fresh(rem_id, rec, since)
+    return dict(rec)
 
+@traced("db.get_templates")
+def get_templates(template_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not template_ids:
+        return {}
+    with Session(engine) as s:
+        rows = s.execute(select(*_TEMPLATE_COLUMNS).where(MessageTemplate.id.in_(template_ids))).all()
+    return {r.id: dict(r._mapping) for r in rows}
+
+@traced("db.exists")
 def exists(rem_id: str) -> bool:
     with Session(engine) as s:
         obj = s.get(Reminder, rem_id)
         return obj is not None
 
-def list_reminders(user_id: str, limit: int = 50, offset: int = 0, is_admin: bool = False) -> List[Dict[str, Any]]:
+def _list_stmt(
+    user_id: str,
+    limit: int,
+    cursor: Optional[Tuple[int, str]] = None,
+    offset: int = 0,
+    status: Optional[str] = None,
+    method: Optional[str] = None,
+    delivery_after: Optional[int] = None,
+    delivery_before: Optional[int] = None,
+):
+    """Newest-first listing for one user; ``cursor`` is the ``(sort_ts, id)`` of the last row seen.
+
+    Rows carry their sort key as an extra ``sort_ts`` column for building the next cursor.
+    """
+    key = _created_key()
+    stmt = (
+        select(*_OUT_COLUMNS, key.label("sort_ts"))
+        .where(Reminder.user_id == user_id)
+        .order_by(key.desc(), Reminder.id.desc())
+        .limit(limit)
+    )
+    if cursor is not None:
+        stmt = stmt.where(tuple_(key, Reminder.id) < tuple_(*cursor))
+    elif offset:
+        stmt = stmt.offset(offset)
+    if status:
+        stmt = stmt.where(Reminder.status == status)
+    if method:
+        stmt = stmt.where(Reminder.method == method)
+    if delivery_after is not None:
+        stmt = stmt.where(Reminder.delivery_ts >= delivery_after)
+    if delivery_before is not None:
+        stmt = stmt.where(Reminder.delivery_ts < delivery_before)
+    return stmt
+
+def _export_stmt(
+    user_id: Optional[str] = None,
+    status: Optional[str] = None,
+    method: Optional[str] = None,
+    created_after: Optional[int] = None,
+    created_before: Optional[int] = None,
+    delivery_after: Optional[int] = None,
+    delivery_before: Optional[int] = None,
+):
+    """Oldest-first scan for bulk export; time bounds are epoch ms, ``after`` inclusive and ``before`` exclusive."""
+    stmt = select(*_OUT_COLUMNS).order_by(Reminder.created_ts, Reminder.id)
+    if user_id:
+        stmt = stmt.where(Reminder.user_id == user_id)
+    if status:
+        stmt = stmt.where(Reminder.status == status)
+    if method:
+        stmt = stmt.where(Reminder.method == method)
+    if created_after is not None:
+        stmt = stmt.where(Reminder.created_ts >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(Reminder.created_ts < created_before)
+    if delivery_after is not None:
+        stmt = stmt.where(Reminder.delivery_ts >= delivery_after)
+    if delivery_before is not None:
+        stmt = stmt.where(Reminder.delivery_ts < delivery_before)
+    return stmt
+
+@traced("db.list_reminders")
+def list_reminders(user_id: str, limit: int = 50, offset: int = 0, **filters: Any) -> List[Dict[str, Any]]:
     with Session(engine) as s:
-        stmt = select(Reminder).order_by(Reminder.created_at.desc()).limit(limit).offset(offset)
-        if not is_admin:
-            stmt = stmt.where(Reminder.user_id == user_id)
-        rows = s.scalars(stmt).all()
-        return [r.__dict__ | {} for r in rows]
+        rows = [dict(r._mapping) for r in s.execute(_list_stmt(user_id, limit, offset=offset, **filters))]
+    for r in rows:
+        del r["sort_ts"]
+    return rows
 
+@traced("db.fetch_due")
 def fetch_due(upto_iso: str) -> List[Dict[str, Any]]:
     with Session(engine) as s:
-        stmt = select(Reminder).where(Reminder.status=="scheduled", Reminder.delivery_time <= upto_iso)
-        rows = s.scalars(stmt).all()
-        return [r.__dict__ | {} for r in rows]
+        stmt = select(*_OUT_COLUMNS).where(Reminder.status=="scheduled", _due_before(iso_to_epoch_ms(upto_iso)))
+        return [dict(r._mapping) for r in s.execute(stmt)]
 
-def cleanup_old_reminders(days_old: int = 30) -> int:
-    from sqlalchemy import text
+@traced("db.count_due")
+def count_due(upto_ms: int) -> int:
     with Session(engine) as s:
-        # SQLite and Postgres both understand now and interval-ish via julianday/now(); use a generic string compare fallback
-        q = text("""
-            DELETE FROM reminders
-            WHERE created_at < strftime('%Y-%m-%dT%H:%M:%fZ', datetime('now', :delta))
-        """)
-        # For Postgres, we'll fallback to simple comparison by passing ISO cutoff from Python if needed.
-        try:
-            res = s.execute(q, {"delta": f"-{days_old} days"})
-            s.commit()
-            return getattr(res, "rowcount", 0) or 0
-        except Exception:
-            # Fallback portable way
-            from datetime import datetime, timedelta, timezone
-            cutoff = (datetime.now(timezone.utc) - timedelta(days=days_old)).isoformat()
-            stmt = delete(Reminder).where(Reminder.created_at < cutoff)
-            res = s.execute(stmt)
-            s.commit()
-            return getattr(res, "rowcount", 0) or 0
+        return s.scalar(select(func.count()).select_from(Reminder).where(Reminder.status == "scheduled", _due_before(upto_ms))) or 0
 
+@traced("db.fetch_window")
+def fetch_window(after_ms: int, upto_ms: int, after_id: str = "", limit: int = 1000) -> List[Tuple[str, int]]:
+    """Page scheduled ``(id, delivery_ts)`` pairs due in ``((after_ms, after_id), upto_ms]``, ordered by due time."""
+    with Session(engine) as s:
+        stmt = (
+            select(Reminder.id, Reminder.delivery_ts)
+            .where(
+                Reminder.status == "scheduled",
+                tuple_(Reminder.delivery_ts, Reminder.id) > tuple_(after_ms, after_id),
+                Reminder.delivery_ts <= upto_ms,
+            )
+            .order_by(Reminder.delivery_ts, Reminder.id)
+            .limit(limit)
+        )
+        return [(r.id, r.delivery_ts) for r in s.execute(stmt)]
 
-def update_reminder(rem_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Update arbitrary fields of a reminder."""
+@traced("db.fetch_changed")
+def fetch_changed(after: Tuple[int, str], limit: int = 1000) -> List[Tuple[str, str, Optional[int], int]]:
+    """Page ``(id, status, delivery_ts, updated_ts)`` of reminders written after ``after = (updated_ts, id)``."""
     with Session(engine) as s:
+        stmt = (
+            select(Reminder.id, Reminder.status, Reminder.delivery_ts, Reminder.updated_ts)
+            .where(tuple_(Reminder.updated_ts, Reminder.id) > tuple_(*after))
+            .order_by(Reminder.updated_ts, Reminder.id)
+            .limit(limit)
+        )
+        return [(r.id, r.status, r.delivery_ts, r.updated_ts) for r in s.execute(stmt)]
+
+def listen_for_changes(on_change: Callable[[], None], stop: threading.Event, poll_seconds: float = 1.0):
+    """Block on ``LISTEN reminder_changes`` and call ``on_change`` per batch of notifications until ``stop`` is set.
+
+    Needs Postgres through psycopg2; returns at once on any other backend.
+    """
+    if engine.dialect.name != "postgresql" or engine.driver != "psycopg2":
+        log.warning("change notifications need postgresql+psycopg2; relying on polling")
+        return
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANGES_CHANNEL}")
+        while not stop.is_set():
+            if not select_fds([conn], [], [], poll_seconds)[0]:
+                continue
+            conn.poll()
+            if conn.notifies:
+                conn.notifies.clear()
+                on_change()
+    finally:
+        raw.close()
+
+def _lease_expiry(lease_seconds: int) -> int:
+    return now_epoch_ms() + int(lease_seconds * 1000)
+
+@traced("db.claim_due")
+def claim_due(owner: str, upto_ms: int, lease_seconds: int = 300, limit: int = 100) -> List[Dict[str, Any]]:
+    """Atomically lease up to ``limit`` due reminders for ``owner`` and mark them ``sending``.
+
+    Postgres locks the candidate page with ``FOR UPDATE SKIP LOCKED`` so concurrent
+    dispatchers take disjoint pages; every backend also re-checks ``status`` in the
+    UPDATE, which is the compare-and-set that keeps SQLite safe. Candidates are
+    taken highest priority first, then by due time, so a backlog drains critical
+    reminders before low-priority ones.
+    """
+    candidates = (
+        select(Reminder.id)
+        .where(Reminder.status == "scheduled", _due_before(upto_ms))
+        .order_by(Reminder.priority.desc(), Reminder.delivery_ts)
+        .limit(limit)
+    )
+    if engine.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    expiry = _lease_expiry(lease_seconds)
+
+    def op(s: Session) -> List[Dict[str, Any]]:
+        ids = s.scalars(candidates).all()
+        if not ids:
+            return []
         stmt = (
             update(Reminder)
-            .where(Reminder.id == rem_id)
-            .values(**fields)
-            .returning(Reminder)
+            .where(Reminder.id.in_(ids), Reminder.status == "scheduled")
+            .values(status="sending", lease_owner=owner, lease_expires_ts=expiry)
+            .returning(*_COLUMNS)
+            .execution_options(synchronize_session=False)
         )
-        res = s.execute(stmt).fetchone()
-        s.commit()
-        if res:
-            # SQLAlchemy row returns model instance
-            obj = res[0]
-            return obj.__dict__ | {}
-        return None
+        return [dict(r._mapping) for r in s.execute(stmt).all()]
+
+    rows = _write(op)
+    _cache.delete_many(r["id"] for r in rows)
+    return rows
+
+@traced("db.claim")
+def claim(rem_id: str, owner: str, lease_seconds: int = 300) -> Optional[Dict[str, Any]]:
+    """Lease a single ``scheduled`` reminder; returns None if another dispatcher got it first."""
+    stmt = (
+        update(Reminder)
+        .where(Reminder.id == rem_id, Reminder.status == "scheduled")
+        .values(status="sending", lease_owner=owner, lease_expires_ts=_lease_expiry(lease_seconds))
+        .returning(*_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+    def op(s: Session) -> Optional[Dict[str, Any]]:
+        row = s.execute(stmt).fetchone()
+        return dict(row._mapping) if row is not None else None
+
+    rem = _write(op)
+    if rem is not None:
+        _cache.delete(rem_id)
+    return rem
+
+def _upsert(table):
+    """Dialect INSERT that supports ``on_conflict_do_*`` (SQLite and Postgres)."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(table)
+
+@traced("db.write_outcomes")
+def write_outcomes(owner: str, completions: List[Dict[str, Any]], attempts: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    """Apply many delivery outcomes for ``owner`` in one transaction; returns the ids actually completed.
+
+    ``completions`` are ``{"id", "status", "occurrence_ts", "next_delivery"}``; all of
+    them go out as a single ``UPDATE ... SET status = CASE id ...``. Reminders whose
+    lease was lost or that were cancelled are skipped. For recurring reminders
+    (``occurrence_ts`` set) the occurrence is logged and, with ``next_delivery``, the
+    reminder returns to ``scheduled`` for that time. A ``reminder_metadata`` key in a
+    completion replaces the stored metadata (digests record their id this way).
+    ``attempts`` rows are appended to
+    ``delivery_attempts`` in the same transaction; a repeated idempotency key is ignored.
+    """
+    def op(s: Session) -> List[str]:
+        done: List[str] = []
+        if attempts:
+            s.execute(_upsert(DeliveryAttempt).on_conflict_do_nothing(index_elements=["idempotency_key"]), list(attempts))
+        if completions:
+            ids = [c["id"] for c in completions]
+            status_by_id = {c["id"]: "scheduled" if c.get("next_delivery") else c["status"] for c in completions}
+            values: Dict[str, Any] = {
+                "status": case(status_by_id, value=Reminder.id, else_=Reminder.status),
+                "lease_owner": None,
+                "lease_expires_ts": None,
+            }
+            moved = {c["id"]: c["next_delivery"] for c in completions if c.get("next_delivery")}
+            if moved:
+                values["delivery_time"] = case({k: v.isoformat() for k, v in moved.items()}, value=Reminder.id, else_=Reminder.delivery_time)
+                values["delivery_ts"] = case({k: to_epoch_ms(v) for k, v in moved.items()}, value=Reminder.id, else_=Reminder.delivery_ts)
+            metadata = {c["id"]: c["reminder_metadata"] for c in completions if c.get("reminder_metadata") is not None}
+            if metadata:
+                values["reminder_metadata"] = case(
+                    {k: literal(v, SA_JSON) for k, v in metadata.items()}, value=Reminder.id, else_=Reminder.reminder_metadata
+                )
+            done = list(s.scalars(
+                update(Reminder)
+                .where(Reminder.id.in_(ids), Reminder.status == "sending", Reminder.lease_owner == owner)
+                .values(**values)
+                .returning(Reminder.id)
+                .execution_options(synchronize_session=False)
+            ).all())
+            matched = set(done)
+            now_ms = now_epoch_ms()
+            occurrences = [
+                {"reminder_id": c["id"], "occurrence_ts": c["occurrence_ts"], "status": c["status"], "completed_ts": now_ms}
+                for c in completions
+                if c["id"] in matched and c.get("occurrence_ts") is not None
+            ]
+            if occurrences:
+                # A re-sent occurrence (lease expired mid-send) overwrites its row.
+                stmt = _upsert(ReminderOccurrence)
+                s.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["reminder_id", "occurrence_ts"],
+                        set_={"status": stmt.excluded.status, "completed_ts": stmt.excluded.completed_ts},
+                    ),
+                    occurrences,
+                )
+        return done
+
+    done = _write(op)
+    if completions:
+        _cache.delete_many(c["id"] for c in completions)
+    return done
+
+@traced("db.complete")
+def complete(
+    rem_id: str,
+    owner: str,
+    status: str,
+    occurrence_ts: Optional[int] = None,
+    next_delivery: Optional[datetime] = None,
+) -> bool:
+    """Record the outcome of one leased delivery; a no-op if the lease was lost or the reminder cancelled.
+
+    See ``write_outcomes`` for recurring reminders.
+    """
+    entry = {"id": rem_id, "status": status, "occurrence_ts": occurrence_ts, "next_delivery": next_delivery}
+    return bool(write_outcomes(owner, [entry]))
+
+@traced("db.extend_leases")
+def extend_leases(rem_ids: List[str], owner: str, lease_seconds: int = 300) -> int:
+    """Push back the lease expiry of reminders ``owner`` still holds (queued, throttled or
+    waiting for a digest), so a long hold is not mistaken for a dead dispatcher."""
+    expiry = _lease_expiry(lease_seconds)
+
+    def op(s: Session) -> int:
+        n = 0
+        for i in range(0, len(rem_ids), 500):
+            res = s.execute(
+                update(Reminder)
+                .where(Reminder.id.in_(rem_ids[i:i + 500]), Reminder.status == "sending", Reminder.lease_owner == owner)
+                .values(lease_expires_ts=expiry)
+            )
+            n += getattr(res, "rowcount", 0) or 0
+        return n
+
+    return _write(op) if rem_ids else 0
+
+@traced("db.release")
+def release(rem_ids: List[str], owner: str) -> int:
+    """Hand leased reminders back to ``scheduled`` without sending them (e.g. the delivery queue is full)."""
+    if not rem_ids:
+        return 0
+    stmt = (
+        update(Reminder)
+        .where(Reminder.id.in_(rem_ids), Reminder.status == "sending", Reminder.lease_owner == owner)
+        .values(status="scheduled", lease_owner=None, lease_expires_ts=None)
+    )
+    n = _write(lambda s: getattr(s.execute(stmt), "rowcount", 0) or 0)
+    _cache.delete_many(rem_ids)
+    return n
+
+@traced("db.reclaim_expired_leases")
+def reclaim_expired_leases(now_ms: int) -> int:
+    """Return reminders whose lease expired (e.g. the owning process died) to ``scheduled``.
+
+    A ``sending`` row without ``lease_expires_ts`` was leased before that column
+    existed and counts as expired.
+    """
+    stmt = (
+        update(Reminder)
+        .where(Reminder.status == "sending", or_(Reminder.lease_expires_ts.is_(None), Reminder.lease_expires_ts < now_ms))
+        .values(status="scheduled", lease_owner=None, lease_expires_ts=None)
+        .returning(Reminder.id)
+        .execution_options(synchronize_session=False)
+    )
+    ids = _write(lambda s: list(s.scalars(stmt).all()))
+    _cache.delete_many(ids)
+    return len(ids)
+
+# Recurring series that are still running are never purged, however old.
+_PURGEABLE = or_(Reminder.recurrence.is_(None), Reminder.status.notin_(("scheduled", "sending")))
+
+@traced("db.fetch_created_before")
+def fetch_created_before(cutoff_ms: int, after: Optional[Tuple[int, str]], limit: int) -> List[Dict[str, Any]]:
+    """Oldest-first page of full rows created before ``cutoff_ms``; ``after`` is the last ``(created_ts, id)``."""
+    stmt = select(*_COLUMNS).where(Reminder.created_ts < cutoff_ms, _PURGEABLE)
+    if after is not None:
+        stmt = stmt.where(tuple_(Reminder.created_ts, Reminder.id) > tuple_(*after))
+    with Session(engine) as s:
+        rows = s.execute(stmt.order_by(Reminder.created_ts, Reminder.id).limit(limit)).all()
+    return [dict(r._mapping) for r in rows]
+
+@traced("db.fetch_unstamped_created_before")
+def fetch_unstamped_created_before(cutoff_iso: str, after_id: str, limit: int) -> List[Dict[str, Any]]:
+    """Same as ``fetch_created_before`` for rows the timestamp backfill has not reached yet."""
+    with Session(engine) as s:
+        rows = s.execute(
+            select(*_COLUMNS)
+            .where(Reminder.created_ts.is_(None), Reminder.created_at < cutoff_iso, Reminder.id > after_id, _PURGEABLE)
+            .order_by(Reminder.id)
+            .limit(limit)
+        ).all()
+    return [dict(r._mapping) for r in rows]
+
+@traced("db.delete_ids")
+def delete_ids(rem_ids: List[str]) -> int:
+    if not rem_ids:
+        return 0
+    def op(s: Session) -> int:
+        res = s.execute(delete(Reminder).where(Reminder.id.in_(rem_ids)))
+        s.execute(delete(ReminderOccurrence).where(ReminderOccurrence.reminder_id.in_(rem_ids)))
+        s.execute(delete(DeliveryAttempt).where(DeliveryAttempt.reminder_id.in_(rem_ids)))
+        return getattr(res, "rowcount", 0) or 0
+
+    n = _write(op)
+    _cache.delete_many(rem_ids)
+    return n
+
+def cleanup_old_reminders(days_old: int = 30) -> int:
+    """Purge reminders older than ``days_old`` days in batches; see ``retention.purge``."""
+    from app.services import retention
+    return retention.purge(
+        days_old,
+        batch_size=settings.RETENTION_BATCH_SIZE,
+        pause_seconds=settings.RETENTION_PAUSE_SECONDS,
+    )["deleted"]
+
+
+@traced("db.update_reminder")
+def update_reminder(rem_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update arbitrary fields of a reminder."""
+    rec = _write(_update_op(rem_id, fields))
+    # Invalidate rather than cache the returned row: concurrent updates may
+    # commit in a different order than they reach this line.
+    _cache.delete(rem_id)
+    return rec
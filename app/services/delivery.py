@@ -1,10 +1,24 @@
-
-import smtplib
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import queue
+import threading
+import time
 from email.mime.text import MIMEText
-from typing import Dict, Any
-from twilio.rest import Client
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential
 from app.config import settings
+from app.schemas.reminder import PRIORITY_NORMAL
+from app.services import sms, smtp_pool, templates
+from app.utils import metrics
+from app.utils.logging import reminder_context
+from app.utils.ratelimit import KeyedTokenBuckets, TokenBucket, parse_rate_limits, spread_offset
+from app.utils.time import now_epoch_ms
+from app.utils.tracing import traced
+
+log = logging.getLogger(__name__)
 
 def _has_smtp():
     return all([settings.SMTP_HOST, settings.SMTP_USER, settings.SMTP_PASS])
@@ -12,36 +26,348 @@ def _has_smtp():
 def _has_twilio():
     return all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_FROM])
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
-def send_email(to_email: str, subject: str, body: str) -> bool:
+@traced("delivery.email.attempt")
+def _send_email_once(to_email: str, subject: str, body: str) -> bool:
     if not _has_smtp():
-        print(f"[FAKE EMAIL] to={to_email} subject={subject}")
+        log.info("fake email to %s", to_email, extra={"channel": "email", "subject": subject})
         return True
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"] = settings.SMTP_USER
     msg["To"] = to_email
-    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=20) as server:
-        server.starttls()
-        server.login(settings.SMTP_USER, settings.SMTP_PASS)
-        server.sendmail(settings.SMTP_USER, [to_email], msg.as_string())
+    smtp_pool.get_pool().send(settings.SMTP_USER, [to_email], msg.as_string())
     return True
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
-def send_sms(to_number: str, subject: str, body: str) -> bool:
+@traced("delivery.sms.attempt")
+def _send_sms_once(to_number: str, subject: str, body: str) -> bool:
     if not _has_twilio():
-        print(f"[FAKE SMS] to={to_number} body={subject} - {body}")
+        log.info("fake sms to %s", to_number, extra={"channel": "sms", "subject": subject})
         return True
-    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-    message = client.messages.create(body=f"{subject} - {body}", from_=settings.TWILIO_FROM, to=to_number)
-    print(f"[SMS SID] {message.sid}")
+    sid = sms.send(to_number, f"{subject} - {body}")
+    log.info("sms sent", extra={"channel": "sms", "sid": sid})
     return True
 
+@traced("delivery.email")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
+def send_email(to_email: str, subject: str, body: str) -> bool:
+    return _send_email_once(to_email, subject, body)
+
+@traced("delivery.sms")
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
+def send_sms(to_number: str, subject: str, body: str) -> bool:
+    return _send_sms_once(to_number, subject, body)
+
+_SENDERS: Dict[str, Callable[[str, str, str], bool]] = {
+    "email": _send_email_once,
+    "sms": _send_sms_once,
+}
+
+@traced("delivery.deliver")
 def deliver(rem: Dict[str, Any]) -> bool:
     method = rem.get("method", "email")
-    if method == "email":
-        return send_email(rem["user_id"], rem["title"], rem["message"])
-    if method == "sms":
-        return send_sms(rem["user_id"], rem["title"], rem["message"])
-    print(f"[DELIVERY ERROR] Unsupported method: {method}")
-    return False
+    with reminder_context(rem.get("id")):
+        try:
+            title, message = templates.render(rem)
+        except templates.TemplateError as e:
+            log.error("cannot render reminder: %s", e)
+            return False
+        if method == "email":
+            return send_email(recipient_of(rem), title, message)
+        if method == "sms":
+            return send_sms(recipient_of(rem), title, message)
+        log.error("unsupported delivery method %r", method)
+        return False
+
+@traced("delivery.deliver_once")
+def deliver_once(rem: Dict[str, Any]) -> bool:
+    """Single send attempt without blocking retries; errors propagate to the caller."""
+    sender = _SENDERS.get(rem.get("method", "email"))
+    with reminder_context(rem.get("id")):
+        if sender is None:
+            log.error("unsupported delivery method %r", rem.get("method"))
+            return False
+        title, message = templates.render(rem)
+        return sender(recipient_of(rem), title, message)
+
+
+def recipient_of(rem: Dict[str, Any]) -> str:
+    """Who a reminder is delivered to (its user id); also keys per-recipient rate limits and digests."""
+    return rem["user_id"]
+
+def priority_of(rem: Dict[str, Any]) -> int:
+    priority = rem.get("priority")
+    return PRIORITY_NORMAL if priority is None else priority
+
+
+OnDone = Callable[[Dict[str, Any], bool], None]
+# (reminder, attempt number, "sent" | "failed" | "error", error text, started ms, finished ms)
+OnAttempt = Callable[[Dict[str, Any], int, str, Optional[str], int, int], None]
+
+
+class _Task:
+    __slots__ = ("rem", "on_done", "attempt", "ctx", "key")
+
+    def __init__(self, rem: Dict[str, Any], on_done: OnDone, seq: int):
+        self.rem = rem
+        self.on_done = on_done
+        self.attempt = 1
+        # Queue order: highest priority first, then submission order (kept across retries).
+        self.key = (-priority_of(rem), seq)
+        # Submitter's context (request id etc.), re-entered by whichever worker runs it.
+        self.ctx = contextvars.copy_context()
+
+
+class DeliveryPool:
+    """Bounded per-channel queues feeding dedicated worker threads.
+
+    Each channel ("email", "sms") has its own queue and concurrency, so a slow SMTP
+    server cannot starve SMS. Failed attempts are parked on a delay heap and
+    re-enqueued later instead of sleeping inside a worker. ``submit`` applies
+    backpressure: it waits at most ``timeout`` seconds for queue space and returns
+    False when the channel is saturated.
+
+    Queues are ordered by reminder priority. ``rate_limits`` caps each channel with
+    a token bucket: workers wait for a token before sending and then take the
+    highest-priority task queued at that moment, so a peak drains at the provider's
+    rate with critical reminders first instead of failing into retries. A per-
+    recipient bucket parks sends to a recipient who is over ``recipient_rate``.
+    Low-priority reminders are spread over ``low_priority_tolerance`` seconds after
+    their due time (a stable per-reminder offset) to flatten top-of-hour spikes.
+    """
+
+    def __init__(
+        self,
+        concurrency: Dict[str, int],
+        queue_size: int = 10000,
+        max_attempts: int = 3,
+        retry_base: float = 1.0,
+        retry_max: float = 10.0,
+        on_attempt: Optional[OnAttempt] = None,
+        rate_limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+        recipient_rate: float = 0.0,
+        recipient_burst: Optional[float] = None,
+        low_priority_tolerance: float = 0.0,
+    ):
+        self._concurrency = concurrency
+        self.on_attempt = on_attempt
+        self._channel_limits = {ch: TokenBucket(rate, burst) for ch, (rate, burst) in (rate_limits or {}).items()}
+        self._recipient_limits = KeyedTokenBuckets(recipient_rate, recipient_burst)
+        self._spread = low_priority_tolerance
+        self._stopping = threading.Event()
+        self._queue_size = queue_size
+        self._max_attempts = max_attempts
+        self._retry_base = retry_base
+        self._retry_max = retry_max
+        self._queues: Dict[str, queue.Queue] = {}
+        self._threads: List[threading.Thread] = []
+        self._delayed: List[Tuple[float, int, str, _Task]] = []
+        self._delayed_cond = threading.Condition()
+        self._seq = itertools.count()
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stopping.clear()
+        for channel, workers in self._concurrency.items():
+            q = queue.PriorityQueue(maxsize=self._queue_size)
+            self._queues[channel] = q
+            for i in range(workers):
+                t = threading.Thread(target=self._work, args=(channel, q), name=f"deliver-{channel}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        t = threading.Thread(target=self._pump_delayed, name="deliver-retry", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        if not self._running:
+            return
+        self._running = False
+        self._stopping.set()
+        with self._delayed_cond:
+            self._delayed_cond.notify_all()
+        for channel, q in self._queues.items():
+            for _ in range(self._concurrency[channel]):
+                try:
+                    # Sorts after every real task, like the end of a FIFO.
+                    q.put_nowait(((math.inf, next(self._seq)), None))
+                except queue.Full:
+                    break
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._threads.clear()
+        self._queues.clear()
+
+    def submit(self, rem: Dict[str, Any], on_done: OnDone, timeout: Optional[float] = None) -> bool:
+        channel = rem.get("method", "email")
+        q = self._queues.get(channel)
+        if q is None:
+            log.error("unsupported delivery method %r", channel, extra={"reminder_id": rem.get("id")})
+            on_done(rem, False)
+            return True
+        task = _Task(rem, on_done, next(self._seq))
+        delay = self._spread_delay(task)
+        if delay > 0:
+            metrics.DELIVERY_ENQUEUED.labels(channel).inc()
+            metrics.DELIVERY_THROTTLED.labels(channel, "spread").inc()
+            self._defer(channel, task, delay)
+            return True
+        try:
+            q.put((task.key, task), timeout=timeout)
+        except queue.Full:
+            metrics.DELIVERY_REJECTED.labels(channel).inc()
+            return False
+        metrics.DELIVERY_ENQUEUED.labels(channel).inc()
+        metrics.DELIVERY_QUEUE_DEPTH.labels(channel).inc()
+        return True
+
+    def _spread_delay(self, task: _Task) -> float:
+        if not self._spread or priority_of(task.rem) >= PRIORITY_NORMAL or task.rem.get("delivery_ts") is None:
+            return 0.0
+        send_at = task.rem["delivery_ts"] / 1000 + spread_offset(task.rem["id"], self._spread)
+        return send_at - time.time()
+
+    def _work(self, channel: str, q: queue.Queue):
+        while True:
+            _, task = q.get()
+            if task is None:
+                return
+            metrics.DELIVERY_QUEUE_DEPTH.labels(channel).dec()
+            task = self._admit(channel, q, task)
+            if task is None:
+                continue
+            # A fresh copy per attempt: a retried task may be picked up by another
+            # worker before this one has left the context.
+            task.ctx.copy().run(self._attempt, channel, task)
+
+    def _admit(self, channel: str, q: queue.Queue, task: _Task) -> Optional[_Task]:
+        """Apply the rate limits to ``task``; returns the task to send now, or None if it was parked."""
+        bucket = self._channel_limits.get(channel)
+        if bucket is not None:
+            wait = bucket.take()
+            if wait:
+                metrics.DELIVERY_THROTTLED.labels(channel, "channel_limit").inc()
+                while wait:
+                    if self._stopping.wait(wait):
+                        return None
+                    wait = bucket.take()
+                task = self._preempt(q, task)
+        wait = self._recipient_limits.take(f"{channel}:{recipient_of(task.rem)}")
+        if wait:
+            if bucket is not None:
+                bucket.refund()
+            metrics.DELIVERY_THROTTLED.labels(channel, "recipient_limit").inc()
+            self._defer(channel, task, wait)
+            return None
+        return task
+
+    def _preempt(self, q: queue.PriorityQueue, task: _Task) -> _Task:
+        """Swap ``task`` for a higher-priority one that was queued while we waited for a token."""
+        # Swap in place under the queue's own lock: the size does not change, so no
+        # waiter needs waking and a concurrent submit cannot make the put-back fail.
+        with q.mutex:
+            if q.queue and q.queue[0][0][0] < task.key[0]:
+                _, head = heapq.heapreplace(q.queue, (task.key, task))
+                return head
+        return task
+
+    def _attempt(self, channel: str, task: _Task):
+        with reminder_context(task.rem.get("id")):
+            self._send(channel, task)
+
+    def _send(self, channel: str, task: _Task):
+        metrics.DELIVERY_IN_FLIGHT.labels(channel).inc()
+        started = time.perf_counter()
+        started_ms = now_epoch_ms()
+        try:
+            ok = deliver_once(task.rem)
+            metrics.SEND_LATENCY.labels(channel).observe(time.perf_counter() - started)
+            self._record(task, "sent" if ok else "failed", None, started_ms)
+        except sms.Throttled as e:
+            # Provider pacing: park it without spending an attempt.
+            self._defer(channel, task, e.delay)
+            return
+        except templates.TemplateError as e:
+            # Deleted template or missing variable: retrying cannot help.
+            metrics.SEND_LATENCY.labels(channel).observe(time.perf_counter() - started)
+            self._record(task, "error", str(e), started_ms)
+            log.warning("cannot render %s: %s", task.rem.get("id"), e)
+            ok = False
+        except Exception as e:
+            metrics.SEND_LATENCY.labels(channel).observe(time.perf_counter() - started)
+            self._record(task, "error", str(e), started_ms)
+            if task.attempt < self._max_attempts:
+                self._retry_later(channel, task, e)
+                return
+            log.warning("delivery of %s failed after %d attempts: %s", task.rem.get("id"), task.attempt, e)
+            ok = False
+        finally:
+            metrics.DELIVERY_IN_FLIGHT.labels(channel).dec()
+        self._finish(channel, task, ok)
+
+    def _record(self, task: _Task, status: str, error: Optional[str], started_ms: int):
+        if self.on_attempt is None:
+            return
+        try:
+            self.on_attempt(task.rem, task.attempt, status, error, started_ms, now_epoch_ms())
+        except Exception:
+            log.exception("attempt hook for %s failed", task.rem.get("id"))
+
+    def _finish(self, channel: str, task: _Task, ok: bool):
+        metrics.DELIVERY_RESULTS.labels(channel, "sent" if ok else "failed").inc()
+        try:
+            task.on_done(task.rem, ok)
+        except Exception:
+            log.exception("delivery callback for %s failed", task.rem.get("id"))
+
+    def _retry_later(self, channel: str, task: _Task, error: Exception):
+        delay = min(self._retry_max, self._retry_base * (2 ** (task.attempt - 1)))
+        task.attempt += 1
+        metrics.DELIVERY_RETRIES.labels(channel).inc()
+        log.info("delivery of %s failed (%s); retry %d in %.1fs", task.rem.get("id"), error, task.attempt, delay)
+        self._defer(channel, task, delay)
+
+    def _defer(self, channel: str, task: _Task, delay: float):
+        metrics.DELIVERY_RETRY_PENDING.labels(channel).inc()
+        with self._delayed_cond:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), channel, task))
+            self._delayed_cond.notify()
+
+    def _pump_delayed(self):
+        while True:
+            with self._delayed_cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                if not self._delayed or self._delayed[0][0] > now:
+                    wait = self._delayed[0][0] - now if self._delayed else None
+                    self._delayed_cond.wait(timeout=wait)
+                    continue
+                _, _, channel, task = heapq.heappop(self._delayed)
+            metrics.DELIVERY_RETRY_PENDING.labels(channel).dec()
+            try:
+                self._queues[channel].put_nowait((task.key, task))
+                metrics.DELIVERY_QUEUE_DEPTH.labels(channel).inc()
+            except queue.Full:
+                # Queue saturated: park it again briefly rather than block the pump.
+                self._defer(channel, task, self._retry_base)
+
+
+pool = DeliveryPool(
+    {"email": settings.DELIVERY_EMAIL_CONCURRENCY, "sms": settings.DELIVERY_SMS_CONCURRENCY},
+    queue_size=settings.DELIVERY_QUEUE_SIZE,
+    max_attempts=settings.DELIVERY_MAX_ATTEMPTS,
+    retry_base=settings.DELIVERY_RETRY_BASE_SECONDS,
+    retry_max=settings.DELIVERY_RETRY_MAX_SECONDS,
+    rate_limits=parse_rate_limits(settings.DELIVERY_RATE_LIMITS),
+    recipient_rate=settings.DELIVERY_RECIPIENT_RATE,
+    recipient_burst=settings.DELIVERY_RECIPIENT_BURST,
+    low_priority_tolerance=settings.DELIVERY_LOW_PRIORITY_TOLERANCE_SECONDS,
+)
@@ -0,0 +1,147 @@
+"""Per-recipient digests: several due reminders, one message.
+
+With ``DIGEST_WINDOW_SECONDS`` > 0, a claimed reminder is not handed to the
+delivery pool right away. It joins a group keyed by channel and recipient
+(``delivery.recipient_of``) that is released once the window since the group's
+first reminder has passed, or as soon as ``DIGEST_MAX_ITEMS`` have gathered. A
+group of one is sent as usual. A larger group is sent as one digest message
+listing every reminder, so a patient with four medications due at 8:00 gets
+one email or SMS instead of four. Critical reminders, and reminders with
+``reminder_metadata.digest`` set to false, are never held.
+
+Held reminders keep their lease, which the scheduler renews while they wait,
+and the window is capped below ``DISPATCH_LEASE_SECONDS`` (checked when the
+settings load). Reminders still held at shutdown are released at once.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from app.config import settings
+from app.schemas.reminder import PRIORITY_CRITICAL
+from app.services import templates
+from app.services.delivery import priority_of, recipient_of
+from app.utils import metrics
+
+log = logging.getLogger(__name__)
+
+# (lease owner, reminders) of a released group
+OnRelease = Callable[[str, List[Dict[str, Any]]], None]
+
+
+def build(rems: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One reminder-shaped digest for ``rems`` (same recipient and channel).
+
+    The originals travel along in ``digest_of`` so their outcomes can be written
+    back. Raises TemplateError if one of them cannot be rendered.
+    """
+    first = rems[0]
+    channel = first.get("method", "email")
+    parts = [templates.render(r) for r in rems]
+    if channel == "sms":
+        body = "\n".join(f"- {title}: {message}" for title, message in parts)
+    else:
+        body = "\n\n".join(f"{title}\n{message}" for title, message in parts)
+    return {
+        "id": str(uuid4()),
+        "user_id": first["user_id"],
+        "method": channel,
+        "title": f"{len(rems)} reminders",
+        "message": body,
+        "reminder_metadata": {},
+        "priority": max(priority_of(r) for r in rems),
+        "delivery_ts": min((r["delivery_ts"] for r in rems if r.get("delivery_ts") is not None), default=None),
+        "digest_of": rems,
+    }
+
+
+class DigestCoalescer:
+    def __init__(self, window: float = 0.0, max_items: int = 10):
+        self.window = window
+        self.max_items = max_items
+        self.on_release: Optional[OnRelease] = None
+        # Insertion order is deadline order, since every group waits the same window.
+        self._groups: Dict[Tuple[str, str, str], Tuple[float, List[Dict[str, Any]]]] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running or self.window <= 0:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="digest-coalescer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Release every held group now, then stop."""
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def accepts(self, rem: Dict[str, Any]) -> bool:
+        if not self._running or priority_of(rem) >= PRIORITY_CRITICAL:
+            return False
+        return (rem.get("reminder_metadata") or {}).get("digest", True) is not False
+
+    def add(self, rem: Dict[str, Any], owner: str):
+        """Hold ``rem`` (leased by ``owner``) for its recipient's digest."""
+        key = (owner, rem.get("method", "email"), recipient_of(rem))
+        full = None
+        with self._cond:
+            if not self._running:
+                # Raced with stop(): nobody will release a new group.
+                full = [rem]
+            else:
+                group = self._groups.get(key)
+                if group is None:
+                    group = self._groups[key] = (time.monotonic() + self.window, [])
+                    self._cond.notify()
+                group[1].append(rem)
+                if len(group[1]) >= self.max_items:
+                    full = self._groups.pop(key)[1]
+                self._pending_changed()
+        if full is not None:
+            self._release(owner, full)
+
+    def _pending_changed(self):
+        metrics.DIGEST_PENDING.set(sum(len(rems) for _, rems in self._groups.values()))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                ready: List[Tuple[str, List[Dict[str, Any]]]] = []
+                for key, (deadline, rems) in list(self._groups.items()):
+                    if self._running and deadline > now:
+                        break
+                    del self._groups[key]
+                    ready.append((key[0], rems))
+                if not ready:
+                    if not self._running:
+                        return
+                    deadline = next(iter(self._groups.values()), (None,))[0]
+                    self._cond.wait(None if deadline is None else deadline - now)
+                    continue
+                self._pending_changed()
+            for owner, rems in ready:
+                self._release(owner, rems)
+
+    def _release(self, owner: str, rems: List[Dict[str, Any]]):
+        try:
+            self.on_release(owner, rems)
+        except Exception:
+            log.exception("releasing digest of %d reminders failed", len(rems))
+
+
+coalescer = DigestCoalescer(settings.DIGEST_WINDOW_SECONDS, settings.DIGEST_MAX_ITEMS)
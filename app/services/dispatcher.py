@@ -0,0 +1,209 @@
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services import db
+from app.utils.time import epoch_ms_to_iso, to_epoch_ms
+
+log = logging.getLogger(__name__)
+
+
+class Dispatcher:
+    """Min-heap of reminders due within a rolling horizon.
+
+    Only reminders due before ``now + horizon`` are held in memory. The window is
+    refilled from the database every ``refill_seconds`` by paging on
+    ``(delivery_ts, id)`` past the last loaded watermark, so memory stays flat no
+    matter how many reminders are scheduled further out. Due entries are handed to
+    ``fire(rem_id)`` on a small worker pool.
+
+    With ``watch_seconds`` set, the dispatcher also follows writes made by other
+    processes (API workers) through the ``updated_ts`` change feed: every poll
+    re-reads rows changed since ``watch_lag_seconds`` before the newest change it
+    has seen, scheduling or dropping them. Changes already applied in the overlap
+    are remembered by ``(id, updated_ts)`` and skipped, so a reminder that fired is
+    not pushed back onto the heap. ``wake()`` forces an immediate poll.
+    """
+
+    def __init__(
+        self,
+        fire: Callable[[str], None],
+        horizon_seconds: int = 900,
+        refill_seconds: int = 60,
+        batch_size: int = 1000,
+        workers: int = 10,
+        watch_seconds: float = 0.0,
+        watch_lag_seconds: float = 5.0,
+    ):
+        self._fire = fire
+        self._horizon = timedelta(seconds=horizon_seconds)
+        self._refill_every = refill_seconds
+        self._batch_size = batch_size
+        self._workers = workers
+        self._watch_every = watch_seconds
+        self._watch_lag_ms = int(watch_lag_seconds * 1000)
+        self._watermark = 0  # newest updated_ts seen, epoch ms
+        self._applied: Dict[str, int] = {}  # id -> updated_ts, for changes inside the overlap
+        self._next_watch = float("inf")
+        self._heap: List[Tuple[float, str]] = []
+        self._entries: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._loaded_until: Optional[int] = None  # epoch ms
+        self._next_refill = 0.0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping = False
+        # Anything already overdue is picked up by the fallback scan; the heap only
+        # needs to be rehydrated from "now" forward.
+        self._loaded_until = to_epoch_ms(datetime.now(timezone.utc))
+        self._next_refill = 0.0
+        self._watermark = self._loaded_until
+        self._applied.clear()
+        self._next_watch = 0.0 if self._watch_every else float("inf")
+        self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="dispatch")
+        self._thread = threading.Thread(target=self._run, name="dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._pool:
+            self._pool.shutdown(wait=False)
+        self._thread = None
+        self._pool = None
+        with self._cond:
+            self._heap.clear()
+            self._entries.clear()
+
+    def schedule(self, rem_id: str, due: datetime):
+        """Track ``rem_id`` if it falls inside the current horizon, replacing any earlier due time."""
+        if due > datetime.now(timezone.utc) + self._horizon:
+            # Outside the window: a later refill will load it.
+            self.cancel(rem_id)
+            return
+        ts = due.timestamp()
+        with self._cond:
+            if self._entries.get(rem_id) == ts:
+                return
+            self._entries[rem_id] = ts
+            heapq.heappush(self._heap, (ts, rem_id))
+            if self._heap[0][1] == rem_id:
+                self._cond.notify()
+
+    def cancel(self, rem_id: str):
+        # Heap entries are dropped lazily when they reach the top.
+        with self._cond:
+            self._entries.pop(rem_id, None)
+
+    def wake(self):
+        """Poll the change feed now instead of at the next interval (e.g. on a NOTIFY)."""
+        if not self._watch_every:
+            return
+        with self._cond:
+            self._next_watch = 0.0
+            self._cond.notify()
+
+    def _watch(self):
+        since = self._watermark - self._watch_lag_ms
+        self._applied = {k: v for k, v in self._applied.items() if v > since}
+        after: Tuple[int, str] = (since, "")
+        changed = 0
+        while True:
+            rows = db.fetch_changed(after, limit=self._batch_size)
+            for rem_id, status, delivery_ts, updated_ts in rows:
+                if self._applied.get(rem_id) == updated_ts:
+                    continue
+                self._applied[rem_id] = updated_ts
+                if status == "scheduled" and delivery_ts is not None:
+                    self.schedule(rem_id, datetime.fromtimestamp(delivery_ts / 1000, timezone.utc))
+                else:
+                    self.cancel(rem_id)
+                self._watermark = max(self._watermark, updated_ts)
+                changed += 1
+            if len(rows) < self._batch_size:
+                break
+            after = (rows[-1][3], rows[-1][0])
+        if changed:
+            log.debug("dispatcher applied %d changes since %s", changed, epoch_ms_to_iso(since))
+
+    def _refill(self):
+        upto = to_epoch_ms(datetime.now(timezone.utc) + self._horizon)
+        after_ms, after_id = self._loaded_until, ""
+        loaded = 0
+        while True:
+            rows = db.fetch_window(after_ms, upto, after_id=after_id, limit=self._batch_size)
+            with self._cond:
+                for rem_id, delivery_ts in rows:
+                    ts = delivery_ts / 1000
+                    if rem_id not in self._entries:
+                        self._entries[rem_id] = ts
+                        heapq.heappush(self._heap, (ts, rem_id))
+                self._cond.notify()
+            loaded += len(rows)
+            if len(rows) < self._batch_size:
+                break
+            after_id, after_ms = rows[-1]
+        self._loaded_until = upto
+        if loaded:
+            log.info("dispatcher loaded %d reminders up to %s", loaded, epoch_ms_to_iso(upto))
+
+    def _pop_due(self, now: float) -> List[str]:
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            ts, rem_id = heapq.heappop(self._heap)
+            if self._entries.get(rem_id) == ts:
+                del self._entries[rem_id]
+                ready.append(rem_id)
+        return ready
+
+    def _run(self):
+        while True:
+            now = datetime.now(timezone.utc).timestamp()
+            if now >= self._next_refill:
+                try:
+                    self._refill()
+                except Exception:
+                    log.exception("dispatcher refill failed")
+                self._next_refill = now + self._refill_every
+            if now >= self._next_watch:
+                self._next_watch = now + self._watch_every
+                try:
+                    self._watch()
+                except Exception:
+                    log.exception("dispatcher change poll failed")
+            with self._cond:
+                if self._stopping:
+                    return
+                ready = self._pop_due(now)
+                if not ready:
+                    wake_at = min(self._next_refill, self._next_watch)
+                    if self._heap:
+                        wake_at = min(wake_at, self._heap[0][0])
+                    self._cond.wait(timeout=max(0.0, wake_at - now))
+                    continue
+            for rem_id in ready:
+                self._pool.submit(self._fire_safe, rem_id)
+
+    def _fire_safe(self, rem_id: str):
+        try:
+            self._fire(rem_id)
+        except Exception:
+            log.exception("dispatch of reminder %s failed", rem_id)
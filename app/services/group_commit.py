@@ -0,0 +1,122 @@
+"""Group commit: one writer thread, many writes per transaction.
+
+SQLite allows one writer at a time, so request handlers and the scheduler each
+committing their own small transaction end up queueing on the file lock (and,
+past the busy timeout, failing with "database is locked"). ``GroupCommitWriter``
+takes write operations from any thread or event loop and runs everything queued
+(up to ``max_batch``) in a single transaction, so the per-commit fsync and lock
+handoff are paid once per batch. Batches form on their own from writes that
+arrive while the previous commit runs; a ``window`` > 0 additionally waits that
+long for stragglers, trading latency for larger batches. If the shared
+transaction fails, each operation is retried in its own so only the failing one
+reports an error.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.utils import metrics
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Op = Callable[[Session], T]
+
+
+class GroupCommitWriter:
+    def __init__(self, engine: Engine, window: float = 0.0, max_batch: int = 256):
+        self.engine = engine
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Tuple[Op, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Commit what is queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def submit(self, op: Op) -> "Future[T]":
+        """Queue ``op(session)``; the future resolves with its return value once committed."""
+        if not self.running:
+            self.start()
+        fut: Future = Future()
+        self._queue.put((op, fut))
+        return fut
+
+    def run(self, op: Op) -> T:
+        return self.submit(op).result()
+
+    async def run_async(self, op: Op) -> T:
+        return await asyncio.wrap_future(self.submit(op))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            metrics.GROUP_COMMIT_BATCH.observe(len(batch))
+            self._commit(batch)
+            if stopping:
+                self._drain()
+                return
+
+    def _drain(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self._commit([item])
+
+    def _commit(self, batch: List[Tuple[Op, Future]]):
+        try:
+            with Session(self.engine) as s:
+                results = [op(s) for op, _ in batch]
+                s.commit()
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            log.warning("group commit of %d writes failed (%s); retrying one by one", len(batch), type(e).__name__)
+            for item in batch:
+                self._commit([item])
+            return
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
@@ -0,0 +1,193 @@
+"""Batched write-back of delivery outcomes.
+
+Delivery workers do not commit after each send. They hand the outcome to the
+module-level ``writer``, which buffers status transitions and attempt-log rows
+and applies them with ``db.write_outcomes``: one transaction per flush
+interval, holding one bulk ``UPDATE`` and one multi-row attempt insert. A crash
+loses at most one interval of outcomes. Those reminders' leases expire and they
+are sent again; their attempt keys make any duplicate visible in the log.
+
+A flush that keeps failing (``max_retries`` times in a row) is retried entry by
+entry, and an entry that still cannot be written is logged and dropped, so one
+bad outcome cannot hold back every later one.
+"""
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.services import db
+from app.utils import metrics
+
+log = logging.getLogger(__name__)
+
+OnCommitted = Callable[[bool], None]
+# (lease owner, [(completion entry, callback)]) written in one transaction
+Group = Tuple[str, List[Tuple[Dict[str, Any], Optional[OnCommitted]]]]
+
+
+def attempt_key(rem: Dict[str, Any], attempt: int) -> str:
+    """Idempotency key of one send attempt: reminder, occurrence and attempt number."""
+    return f"{rem['id']}:{rem.get('delivery_ts') or 0}:{attempt}"
+
+
+class OutboxWriter:
+    def __init__(self, flush_interval: float = 0.25, max_batch: int = 500, max_retries: int = 3):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # Consecutive failed flushes before outcomes are written one by one.
+        self.max_retries = max_retries
+        self._failures = 0
+        self._completions: List[Tuple[str, Dict[str, Any], Optional[OnCommitted]]] = []
+        self._attempts: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="outbox-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def complete(self, owner: str, entry: Dict[str, Any], on_committed: Optional[OnCommitted] = None):
+        """Queue a status transition (see ``db.write_outcomes``); written inline when the writer is stopped."""
+        with self._cond:
+            self._completions.append((owner, entry, on_committed))
+            self._pending_changed()
+        if not self._running:
+            self.flush()
+
+    def record_attempt(self, row: Dict[str, Any]):
+        """Queue one ``delivery_attempts`` row."""
+        with self._cond:
+            self._attempts.append(row)
+            self._pending_changed()
+        if not self._running:
+            self.flush()
+
+    def _pending_changed(self):
+        pending = len(self._completions) + len(self._attempts)
+        metrics.OUTBOX_PENDING.set(pending)
+        if pending >= self.max_batch:
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._completions) + len(self._attempts) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                completions, self._completions = self._completions, []
+                attempts, self._attempts = self._attempts, []
+                metrics.OUTBOX_PENDING.set(0)
+            if not completions and not attempts:
+                return
+            by_owner: Dict[str, List[Tuple[Dict[str, Any], Optional[OnCommitted]]]] = defaultdict(list)
+            for owner, entry, cb in completions:
+                by_owner[owner].append((entry, cb))
+            # Bound each transaction's IN-list/CASE to max_batch reminders.
+            groups = [
+                (owner, items[i:i + self.max_batch])
+                for owner, items in by_owner.items()
+                for i in range(0, len(items), self.max_batch)
+            ] or [("", [])]
+            for i, (owner, items) in enumerate(groups):
+                try:
+                    done = set(db.write_outcomes(owner, [e for e, _ in items], attempts))
+                except Exception:
+                    self._failures += 1
+                    if self._failures < self.max_retries:
+                        # Put back what was not written and try again next interval.
+                        log.exception("outbox flush failed (%d/%d); retrying next interval", self._failures, self.max_retries)
+                        self._requeue(groups[i:], attempts)
+                        return
+                    log.exception("outbox flush failed %d times; writing entries one by one", self._failures)
+                    self._write_singly(groups[i:], attempts)
+                    return
+                self._failures = 0
+                metrics.OUTBOX_WRITTEN.labels("status").inc(len(items))
+                metrics.OUTBOX_WRITTEN.labels("attempt").inc(len(attempts))
+                attempts = []
+                for entry, cb in items:
+                    _notify(entry, cb, entry["id"] in done)
+
+    def _requeue(self, groups: List[Group], attempts: List[Dict[str, Any]]):
+        with self._cond:
+            self._completions[:0] = [(o, e, cb) for o, rest in groups for e, cb in rest]
+            self._attempts[:0] = attempts
+            self._pending_changed()
+
+    def _write_singly(self, groups: List[Group], attempts: List[Dict[str, Any]]):
+        """Write each outcome in its own transaction so one bad entry cannot hold back the rest.
+
+        An entry that still fails on its own is logged and dropped; a dropped
+        completion leaves its reminder leased until the lease expires. Entries that
+        failed with an ``OperationalError`` (database unreachable or locked) are put
+        back for the next interval instead.
+        """
+        self._failures = 0
+        retry_attempts: List[Dict[str, Any]] = []
+        retry: List[Group] = []
+        for row in attempts:
+            try:
+                db.write_outcomes("", [], [row])
+            except OperationalError:
+                retry_attempts.append(row)
+            except Exception as e:
+                log.error("dropping delivery attempt %s that cannot be written: %s", row.get("idempotency_key"), e)
+                metrics.OUTBOX_DROPPED.labels("attempt").inc()
+            else:
+                metrics.OUTBOX_WRITTEN.labels("attempt").inc()
+        for owner, items in groups:
+            for entry, cb in items:
+                try:
+                    done = db.write_outcomes(owner, [entry], [])
+                except OperationalError:
+                    retry.append((owner, [(entry, cb)]))
+                    continue
+                except Exception as e:
+                    log.error("dropping %r outcome of reminder %s that cannot be written: %s", entry.get("status"), entry["id"], e)
+                    metrics.OUTBOX_DROPPED.labels("status").inc()
+                    done = []
+                else:
+                    metrics.OUTBOX_WRITTEN.labels("status").inc()
+                _notify(entry, cb, entry["id"] in done)
+        if retry or retry_attempts:
+            log.error("outbox cannot reach the database; keeping %d outcomes for the next interval", len(retry) + len(retry_attempts))
+            self._requeue(retry, retry_attempts)
+
+
+def _notify(entry: Dict[str, Any], cb: Optional[OnCommitted], done: bool):
+    if cb is not None:
+        try:
+            cb(done)
+        except Exception:
+            log.exception("outbox callback for %s failed", entry["id"])
+
+writer = OutboxWriter(settings.OUTBOX_FLUSH_INTERVAL_SECONDS, settings.OUTBOX_MAX_BATCH, settings.OUTBOX_MAX_RETRIES)
@@ -0,0 +1,188 @@
+"""Chunked retention purge with optional compressed archives.
+
+Reminders created before the retention window are read oldest-first in keyset
+pages of ``batch_size`` rows and deleted by id, one short transaction per page
+with a pause in between, so the purge never holds long locks or writes one huge
+WAL segment. Each page commits on its own: an interrupted run leaves nothing
+half-done and the next run continues with whatever is still old enough.
+
+With an archive directory, every page is appended to gzip files partitioned by
+creation date (``created_date=YYYY-MM-DD/reminders-<run>.ndjson.gz``) and fsynced
+before the rows are deleted. A crash between the two steps can archive a page
+twice, so consumers should dedupe on ``id``.
+
+Run by hand with ``python -m app.services.retention --days 30 --dry-run``.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+from app.config import settings
+from app.services import db
+from app.utils import export, metrics
+from app.utils.time import epoch_ms_to_iso, now_epoch_ms
+
+log = logging.getLogger(__name__)
+
+_FIELDS = [c.name for c in db._COLUMNS]
+_FORMATS = ("ndjson", "csv")
+
+_running = threading.Lock()
+_stop = threading.Event()
+
+
+class _Archive:
+    """Appends rows to per-day gzip files; each ``write`` adds one gzip member per file."""
+
+    def __init__(self, directory: str, fmt: str, run_id: str):
+        if fmt not in _FORMATS:
+            raise ValueError(f"unknown archive format {fmt!r}")
+        self.directory = directory
+        self.fmt = fmt
+        self.run_id = run_id
+        self.files: List[str] = []
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f"created_date={day}", f"reminders-{self.run_id}.{self.fmt}.gz")
+
+    def _encode(self, rows: List[Dict[str, Any]], header: bool) -> bytes:
+        if self.fmt == "ndjson":
+            return export.ndjson(rows)
+        return export.csv_rows(rows, _FIELDS, header=header)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        by_day: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for r in rows:
+            by_day[str(r["created_at"])[:10]].append(r)
+        for day, part in by_day.items():
+            path = self._path(day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            new = not os.path.exists(path)
+            with open(path, "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                    gz.write(self._encode(part, header=new))
+                raw.flush()
+                os.fsync(raw.fileno())
+            if new:
+                self.files.append(path)
+
+
+def _batches(cutoff_ms: int, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    after = None
+    while True:
+        rows = db.fetch_created_before(cutoff_ms, after, batch_size)
+        if not rows:
+            break
+        yield rows
+        after = (rows[-1]["created_ts"], rows[-1]["id"])
+    if db.backfill_pending():
+        cutoff_iso, after_id = epoch_ms_to_iso(cutoff_ms), ""
+        while True:
+            rows = db.fetch_unstamped_created_before(cutoff_iso, after_id, batch_size)
+            if not rows:
+                break
+            yield rows
+            after_id = rows[-1]["id"]
+
+
+def purge(
+    days_old: int,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.0,
+    archive_dir: Optional[str] = None,
+    archive_format: str = "ndjson",
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Delete (or with ``dry_run`` just count) reminders created more than ``days_old`` days ago.
+
+    Returns a summary with ``matched``/``archived``/``deleted`` counts and the archive
+    files written. Only one purge runs per process; a concurrent call returns at once
+    with ``skipped`` set. ``stop()`` interrupts a run between batches.
+    """
+    cutoff_ms = now_epoch_ms() - days_old * 86_400_000
+    result: Dict[str, Any] = {
+        "cutoff": epoch_ms_to_iso(cutoff_ms),
+        "dry_run": dry_run,
+        "matched": 0,
+        "archived": 0,
+        "deleted": 0,
+        "files": [],
+    }
+    if not _running.acquire(blocking=False):
+        log.warning("retention purge already running; skipping")
+        result["skipped"] = True
+        return result
+    try:
+        _stop.clear()
+        archive = None
+        if archive_dir and not dry_run:
+            archive = _Archive(archive_dir, archive_format, time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()))
+        metrics.RETENTION_RUN_ROWS.set(0)
+        for rows in _batches(cutoff_ms, batch_size):
+            if _stop.is_set():
+                result["interrupted"] = True
+                break
+            result["matched"] += len(rows)
+            metrics.RETENTION_ROWS.labels("matched").inc(len(rows))
+            metrics.RETENTION_RUN_ROWS.set(result["matched"])
+            if dry_run:
+                continue
+            if archive is not None:
+                archive.write(rows)
+                result["archived"] += len(rows)
+                metrics.RETENTION_ROWS.labels("archived").inc(len(rows))
+            deleted = db.delete_ids([r["id"] for r in rows])
+            result["deleted"] += deleted
+            metrics.RETENTION_ROWS.labels("deleted").inc(deleted)
+            if pause_seconds:
+                _stop.wait(pause_seconds)
+        if archive is not None:
+            result["files"] = archive.files
+        if not result.get("interrupted"):
+            metrics.RETENTION_LAST_SUCCESS.set_to_current_time()
+    finally:
+        _running.release()
+    log.info(
+        "retention purge %s: matched=%d archived=%d deleted=%d",
+        "dry run" if dry_run else "done", result["matched"], result["archived"], result["deleted"],
+        extra={"cutoff": result["cutoff"], "interrupted": bool(result.get("interrupted"))},
+    )
+    return result
+
+
+def run() -> Dict[str, Any]:
+    """Nightly job: purge with the configured retention settings."""
+    return purge(
+        settings.RETENTION_DAYS,
+        batch_size=settings.RETENTION_BATCH_SIZE,
+        pause_seconds=settings.RETENTION_PAUSE_SECONDS,
+        archive_dir=settings.RETENTION_ARCHIVE_DIR or None,
+        archive_format=settings.RETENTION_ARCHIVE_FORMAT,
+        dry_run=settings.RETENTION_DRY_RUN,
+    )
+
+
+def stop():
+    _stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge (and optionally archive) old reminders")
+    parser.add_argument("--days", type=int, default=settings.RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.RETENTION_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.RETENTION_PAUSE_SECONDS)
+    parser.add_argument("--archive-dir", default=settings.RETENTION_ARCHIVE_DIR or None)
+    parser.add_argument("--format", choices=_FORMATS, default=settings.RETENTION_ARCHIVE_FORMAT)
+    parser.add_argument("--dry-run", action="store_true", default=settings.RETENTION_DRY_RUN)
+    args = parser.parse_args()
+    result = purge(args.days, args.batch_size, args.pause, args.archive_dir, args.format, args.dry_run)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
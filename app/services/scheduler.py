@@ -1,62 +1,347 @@
 
+import logging
+import os
+import socket
+import threading
 from datetime import datetime, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from apscheduler.jobstores.base import ConflictingIdError
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import uuid4
 
-from app.schemas.reminder import ReminderCreate
-from app.utils.time import parse_iso_utc, now_utc_iso
-from app.services import db, delivery
+from app.schemas.reminder import ReminderCreate, check_text
+from app.utils import metrics, recurrence
+from app.utils.time import parse_iso_utc, now_utc_iso, now_epoch_ms
+from app.utils.tracing import traced
+from app.config import settings
+from app.services import async_db, db, delivery, digest, outbox, retention, sms, smtp_pool, templates
+from app.services.dispatcher import Dispatcher
+
+log = logging.getLogger(__name__)
 
 _scheduler: Optional[BackgroundScheduler] = None
+_dispatcher: Optional[Dispatcher] = None
+_listen_stop = threading.Event()
+# Reminders this process has leased and not yet completed or released. They may
+# wait a long time (spread delay, rate limit, retry backoff, digest window), so
+# _renew_leases keeps their leases from expiring under them.
+_held: Set[str] = set()
+_held_lock = threading.Lock()
 
-def _deliver(rem_id: str):
-    rem = db.get(rem_id)
-    if not rem or rem["status"] != "scheduled":
-        return
+def _node_id() -> str:
+    return settings.DISPATCH_NODE_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+def _deliver_claimed(rem: Dict[str, Any], owner: str) -> bool:
+    """Hand a leased reminder to the delivery pool (or its digest); returns False if the pool is saturated."""
+    with _held_lock:
+        _held.add(rem["id"])
+    if digest.coalescer.accepts(rem):
+        digest.coalescer.add(rem, owner)
+        return True
+    return _submit(rem, owner)
+
+def _release_digest(owner: str, rems: List[Dict[str, Any]]):
+    try:
+        _send_group(owner, rems)
+    except Exception:
+        # Hand the leases back rather than renewing them for reminders nobody will send.
+        log.exception("sending a group of %d reminders failed; releasing them", len(rems))
+        _release([r["id"] for r in rems], owner)
+
+def _send_group(owner: str, rems: List[Dict[str, Any]]):
+    if len(rems) > 1:
+        try:
+            rem = digest.build(rems)
+        except templates.TemplateError:
+            log.exception("cannot build digest; sending %d reminders one by one", len(rems))
+        else:
+            metrics.DIGEST_SIZE.labels(rem["method"]).observe(len(rems))
+            if not _submit(rem, owner):
+                _release([r["id"] for r in rems], owner)
+            return
+    for i, rem in enumerate(rems):
+        if not _submit(rem, owner):
+            _release([r["id"] for r in rems[i:]], owner)
+            return
+
+def _release(rem_ids: List[str], owner: str):
+    """Give leases back (e.g. the delivery queue is full) and stop renewing them."""
+    db.release(rem_ids, owner)
+    _unhold(rem_ids)
+
+def _unhold(rem_ids: Iterable[str]):
+    with _held_lock:
+        _held.difference_update(rem_ids)
+
+def _renew_leases():
+    with _held_lock:
+        ids = list(_held)
+    if ids:
+        db.extend_leases(ids, _node_id(), settings.DISPATCH_LEASE_SECONDS)
+
+def _submit(rem: Dict[str, Any], owner: str) -> bool:
+    def on_done(r: Dict[str, Any], ok: bool):
+        digest_id = r["id"] if "digest_of" in r else None
+        for orig in r.get("digest_of") or [r]:
+            _complete(orig, owner, "sent" if ok else "failed", digest_id)
+        if ok and r.get("delivery_ts") is not None:
+            metrics.DISPATCH_LAG.observe(max(0, now_epoch_ms() - r["delivery_ts"]) / 1000)
+
+    if delivery.pool.running:
+        return delivery.pool.submit(rem, on_done, timeout=settings.DELIVERY_SUBMIT_TIMEOUT_SECONDS)
     ok = False
     try:
         ok = delivery.deliver(rem)
     finally:
-        db.update_status(rem_id, "sent" if ok else "failed")
+        on_done(rem, ok)
+    return True
 
-def create_reminder(p: ReminderCreate):
+def _record_attempt(rem: Dict[str, Any], attempt: int, status: str, error: Optional[str], started_ms: int, finished_ms: int):
+    # A digest attempt is logged against every reminder it carries.
+    for orig in rem.get("digest_of") or [rem]:
+        outbox.writer.record_attempt({
+            "idempotency_key": outbox.attempt_key(orig, attempt),
+            "reminder_id": orig["id"],
+            "occurrence_ts": orig.get("delivery_ts"),
+            "attempt": attempt,
+            "channel": orig.get("method", "email"),
+            "status": status,
+            "error": error[:1000] if error else None,
+            "node": _node_id(),
+            "started_ts": started_ms,
+            "finished_ts": finished_ms,
+        })
+
+@traced("scheduler.complete")
+def _complete(rem: Dict[str, Any], owner: str, status: str, digest_id: Optional[str] = None):
+    entry: Dict[str, Any] = {"id": rem["id"], "status": status, "occurrence_ts": None, "next_delivery": None}
+    if digest_id is not None:
+        entry["reminder_metadata"] = {**(rem.get("reminder_metadata") or {}), "digest_id": digest_id}
+    if rem.get("recurrence"):
+        end = parse_iso_utc(rem["recurrence_end"]) if rem.get("recurrence_end") else None
+        entry["occurrence_ts"] = rem["delivery_ts"]
+        entry["next_delivery"] = recurrence.next_occurrence(
+            rem["recurrence"], rem["timezone"], parse_iso_utc(rem["delivery_time"]), datetime.now(timezone.utc), end
+        )
+
+    def committed(done: bool):
+        _unhold([rem["id"]])
+        if done and entry["next_delivery"]:
+            _schedule_job({"id": rem["id"], "delivery_time": entry["next_delivery"].isoformat()})
+
+    outbox.writer.complete(owner, entry, committed)
+
+@traced("scheduler.deliver")
+def _deliver(rem_id: str):
+    owner = _node_id()
+    rem = db.claim(rem_id, owner, settings.DISPATCH_LEASE_SECONDS)
+    if not rem:
+        return
+    if not _deliver_claimed(rem, owner):
+        # Backpressure: leave it for the fallback scan once the queue drains.
+        _release([rem_id], owner)
+
+def _template_ids(items: List[ReminderCreate]) -> List[str]:
+    return [tid for tid in (templates.reference(p.reminder_metadata)[0] for p in items) if tid]
+
+def _build_record(p: ReminderCreate, known: Dict[str, "templates.Template"]) -> Dict[str, Any]:
+    templates.check({"title": p.title, "message": p.message, "reminder_metadata": p.reminder_metadata}, known)
     dt_utc = parse_iso_utc(p.delivery_time)
-    if dt_utc <= datetime.now(timezone.utc):
+    now = datetime.now(timezone.utc)
+    end = parse_iso_utc(p.recurrence_end) if p.recurrence_end else None
+    if p.recurrence:
+        # Only the first occurrence is materialized; the rest follow on completion.
+        dt_utc = recurrence.first_occurrence(p.recurrence, p.timezone, max(dt_utc, now), end)
+        if dt_utc is None:
+            raise ValueError("recurrence has no occurrence before recurrence_end")
+    elif dt_utc <= now:
         raise ValueError("delivery_time must be in the future (UTC)")
-    from uuid import uuid4
-    rem_id = str(uuid4())
-    rec = {**p.model_dump(), "id": rem_id, "delivery_time": dt_utc.isoformat(), "created_at": now_utc_iso(), "status": "scheduled"}
+    return {
+        **p.model_dump(),
+        # Templated reminders store no text of their own unless overriding the template.
+        "title": p.title or "",
+        "message": p.message or "",
+        "id": str(uuid4()),
+        "delivery_time": dt_utc.isoformat(),
+        "recurrence_end": end.isoformat() if end else None,
+        "created_at": now_utc_iso(),
+        "status": "scheduled",
+    }
+
+def _schedule_job(rec: Dict[str, Any]):
+    if _dispatcher is not None and _dispatcher.running:
+        _dispatcher.schedule(rec["id"], parse_iso_utc(rec["delivery_time"]))
+
+@traced("scheduler.create_reminder")
+def create_reminder(p: ReminderCreate):
+    rec = _build_record(p, templates.get_many(_template_ids([p])))
     db.insert_reminder(rec)
-    if _scheduler and _scheduler.running:
+    _schedule_job(rec)
+    return rec
+
+def _build_batch(items: List[ReminderCreate], known: Dict[str, "templates.Template"]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    results: List[Dict[str, Any]] = []
+    recs: List[Dict[str, Any]] = []
+    for i, p in enumerate(items):
         try:
-            _scheduler.add_job(_deliver, id=rem_id, trigger="date", run_date=dt_utc, args=[rem_id], replace_existing=False)
-        except (ConflictingIdError, AttributeError, ValueError):
-            pass
+            rec = _build_record(p, known)
+        except ValueError as e:
+            results.append({"index": i, "ok": False, "reminder": None, "error": str(e)})
+            continue
+        recs.append(rec)
+        results.append({"index": i, "ok": True, "reminder": rec, "error": None})
+    return results, recs
+
+@traced("scheduler.create_reminders")
+def create_reminders(items: List[ReminderCreate]) -> List[Dict[str, Any]]:
+    """Create many reminders with one insert transaction and one job-registration pass.
+
+    Returns one result per item, in order: ``{"index", "ok", "reminder", "error"}``.
+    Items that fail validation are reported and skipped; the rest are inserted together.
+    """
+    results, recs = _build_batch(items, templates.get_many(_template_ids(items)))
+    db.insert_reminders(recs)
+    for rec in recs:
+        _schedule_job(rec)
+    return results
+
+def _normalize_update(fields: Dict[str, Any]) -> Dict[str, Any]:
+    if "delivery_time" in fields:
+        dt_utc = parse_iso_utc(fields["delivery_time"])
+        if dt_utc <= datetime.now(timezone.utc):
+            raise ValueError("delivery_time must be in the future (UTC)")
+        fields = {**fields, "delivery_time": dt_utc.isoformat()}
+    return fields
+
+# Updates touching these are checked against the stored reminder they merge into.
+_TEXT_FIELDS = ("title", "message", "reminder_metadata")
+
+def _merged_template(current: Dict[str, Any], fields: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    merged = {**current, **fields}
+    check_text(merged.get("title"), merged.get("message"), merged.get("reminder_metadata"))
+    template_id = templates.reference(merged.get("reminder_metadata"))[0]
+    return merged, [template_id] if template_id else []
+
+def _after_update(rec: Optional[Dict[str, Any]], fields: Dict[str, Any]):
+    if rec and "delivery_time" in fields and rec["status"] == "scheduled":
+        _schedule_job(rec)
+
+@traced("scheduler.update_reminder")
+def update_reminder(rem_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    fields = _normalize_update(fields)
+    if any(f in fields for f in _TEXT_FIELDS):
+        current = db.get(rem_id)
+        if current is None:
+            return None
+        merged, ids = _merged_template(current, fields)
+        templates.check(merged, templates.get_many(ids))
+    rec = db.update_reminder(rem_id, fields)
+    _after_update(rec, fields)
+    return rec
+
+# Async variants used by the API routes; the dispatcher keeps the sync path.
+@traced("scheduler.create_reminder")
+async def create_reminder_async(p: ReminderCreate):
+    rec = _build_record(p, await templates.get_many_async(_template_ids([p])))
+    await async_db.insert_reminder(rec)
+    _schedule_job(rec)
+    return rec
+
+@traced("scheduler.create_reminders")
+async def create_reminders_async(items: List[ReminderCreate]) -> List[Dict[str, Any]]:
+    results, recs = _build_batch(items, await templates.get_many_async(_template_ids(items)))
+    await async_db.insert_reminders(recs)
+    for rec in recs:
+        _schedule_job(rec)
+    return results
+
+@traced("scheduler.update_reminder")
+async def update_reminder_async(rem_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    fields = _normalize_update(fields)
+    if any(f in fields for f in _TEXT_FIELDS):
+        current = await async_db.get(rem_id)
+        if current is None:
+            return None
+        merged, ids = _merged_template(current, fields)
+        templates.check(merged, await templates.get_many_async(ids))
+    rec = await async_db.update_reminder(rem_id, fields)
+    _after_update(rec, fields)
     return rec
 
 def remove_job_safe(rem_id: str):
-    if _scheduler and _scheduler.running:
-        try:
-            _scheduler.remove_job(rem_id)
-        except (AttributeError, ValueError):
-            pass
+    if _dispatcher is not None and _dispatcher.running:
+        _dispatcher.cancel(rem_id)
 
+@traced("scheduler.check_due_fallback")
 def _check_due_fallback():
-    now_iso = now_utc_iso()
-    for rem in db.fetch_due(now_iso):
-        _deliver(rem["id"])
+    """Lease overdue reminders page by page; safe to run on any number of nodes at once."""
+    owner = _node_id()
+    db.reclaim_expired_leases(now_epoch_ms())
+    now_ms = now_epoch_ms()
+    metrics.DUE_BACKLOG.set(db.count_due(now_ms))
+    while True:
+        batch = db.claim_due(owner, now_ms, settings.DISPATCH_LEASE_SECONDS, limit=settings.DISPATCH_CLAIM_BATCH)
+        for i, rem in enumerate(batch):
+            if not _deliver_claimed(rem, owner):
+                # Delivery queue is full: give the rest back and stop claiming.
+                _release([r["id"] for r in batch[i:]], owner)
+                return
+        if len(batch) < settings.DISPATCH_CLAIM_BATCH:
+            break
+
+def _backfill():
+    n = db.backfill_timestamps(settings.BACKFILL_BATCH_SIZE, settings.BACKFILL_PAUSE_SECONDS)
+    log.info("backfilled timestamps for %d reminders", n)
+
+def _listen():
+    """Wake the dispatcher on Postgres NOTIFYs; reconnects after errors until shutdown."""
+    while not _listen_stop.is_set():
+        try:
+            db.listen_for_changes(_dispatcher.wake, _listen_stop)
+            return
+        except Exception:
+            log.exception("change listener failed; reconnecting")
+            _listen_stop.wait(5)
 
 def scheduler_startup():
-    global _scheduler
+    global _scheduler, _dispatcher
     if _scheduler and _scheduler.running:
         return
+    outbox.writer.start()
+    delivery.pool.on_attempt = _record_attempt
+    delivery.pool.start()
+    digest.coalescer.on_release = _release_digest
+    digest.coalescer.start()
+    if db.backfill_pending():
+        threading.Thread(target=_backfill, name="backfill-timestamps", daemon=True).start()
+    _dispatcher = Dispatcher(
+        _deliver,
+        horizon_seconds=settings.DISPATCH_HORIZON_SECONDS,
+        refill_seconds=settings.DISPATCH_REFILL_SECONDS,
+        batch_size=settings.DISPATCH_BATCH_SIZE,
+        workers=settings.DISPATCH_WORKERS,
+        watch_seconds=settings.DISPATCH_WATCH_SECONDS,
+        watch_lag_seconds=settings.DISPATCH_WATCH_LAG_SECONDS,
+    )
+    _dispatcher.start()
+    if settings.DISPATCH_NOTIFY and settings.DISPATCH_WATCH_SECONDS:
+        _listen_stop.clear()
+        threading.Thread(target=_listen, name="change-listener", daemon=True).start()
     _scheduler = BackgroundScheduler(timezone="UTC")
     _scheduler.add_job(_check_due_fallback, "interval", minutes=1)
-    _scheduler.add_job(db.cleanup_old_reminders, CronTrigger(hour=0, minute=0))
+    _scheduler.add_job(_renew_leases, "interval", seconds=max(1.0, settings.DISPATCH_LEASE_SECONDS / 3))
+    _scheduler.add_job(retention.run, CronTrigger(hour=0, minute=0), max_instances=1)
     _scheduler.start()
 
 def scheduler_shutdown():
     if _scheduler and _scheduler.running:
         _scheduler.shutdown(wait=False)
+    retention.stop()
+    _listen_stop.set()
+    if _dispatcher is not None:
+        _dispatcher.stop()
+    digest.coalescer.stop()
+    delivery.pool.stop()
+    outbox.writer.stop()
+    smtp_pool.close_all()
+    sms.close()
@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from app.config import settings
+
+
+class Throttled(Exception):
+    """Raised instead of sending when the provider asked us to slow down."""
+
+    def __init__(self, delay: float):
+        super().__init__(f"throttled for {delay:.2f}s")
+        self.delay = delay
+
+
+class AdaptiveThrottle:
+    """AIMD send pacing: additive increase on success, multiplicative decrease on 429.
+
+    ``reserve()`` either takes the next send slot (returns 0) or returns how long to
+    wait for one, so callers can park the message instead of sleeping a worker.
+    ``max_rate <= 0`` disables pacing until the first 429 is seen.
+    """
+
+    def __init__(self, max_rate: float, min_rate: float = 1.0, backoff: float = 0.5, cooldown: float = 1.0):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.rate = max_rate
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate <= 0:
+                return 0.0
+            if now < self._next_slot:
+                return self._next_slot - now
+            self._next_slot = now + 1.0 / self.rate
+            return 0.0
+
+    def on_success(self):
+        with self._lock:
+            if self.rate > 0 and self.rate < self.max_rate:
+                # Roughly +1 msg/s for every second of clean traffic.
+                self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> float:
+        with self._lock:
+            current = self.rate if self.rate > 0 else self.max_rate if self.max_rate > 0 else 10.0
+            self.rate = max(self.min_rate, current * self.backoff)
+            delay = retry_after if retry_after is not None else self.cooldown
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return delay
+
+
+throttle = AdaptiveThrottle(settings.TWILIO_MAX_RATE, min_rate=settings.TWILIO_MIN_RATE)
+
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> Client:
+    """Shared Twilio client backed by one keep-alive HTTP session for all SMS workers."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                http = TwilioHttpClient(pool_connections=True, timeout=settings.TWILIO_TIMEOUT_SECONDS)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, settings.DELIVERY_SMS_CONCURRENCY))
+                http.session.mount("https://", adapter)
+                http.session.mount("http://", adapter)
+                client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http)
+                if settings.TWILIO_API_BASE:
+                    client.api.base_url = settings.TWILIO_API_BASE.rstrip("/")
+                _client = client
+    return _client
+
+
+def send(to_number: str, body: str) -> str:
+    """Send one SMS through the shared client; returns the message SID.
+
+    Raises ``Throttled`` when pacing or a 429 means the message should be retried later.
+    """
+    wait = throttle.reserve()
+    if wait > 0:
+        raise Throttled(wait)
+    try:
+        message = get_client().messages.create(body=body, from_=settings.TWILIO_FROM, to=to_number)
+    except TwilioRestException as e:
+        if e.status == 429:
+            raise Throttled(throttle.on_throttled()) from e
+        raise
+    throttle.on_success()
+    return message.sid
+
+
+def close():
+    global _client
+    with _client_lock:
+        if _client is not None and _client.http_client.session is not None:
+            _client.http_client.session.close()
+        _client = None
@@ -0,0 +1,197 @@
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+# Errors after which a session can no longer be trusted and must be dropped.
+_BROKEN = (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError)
+
+
+class _Conn:
+    __slots__ = ("smtp", "last_used", "sent")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+class SMTPPool:
+    """Authenticated SMTP sessions reused across messages.
+
+    A session is handed out LIFO so the warmest connection is used first. Sessions
+    idle for longer than ``noop_after`` are probed with NOOP before reuse, those
+    idle past ``idle_timeout`` are closed, and a session is retired after
+    ``max_messages`` sends so long-lived connections are recycled.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = "",
+        password: str = "",
+        starttls: bool = True,
+        max_size: int = 8,
+        max_messages: int = 100,
+        idle_timeout: float = 60.0,
+        noop_after: float = 15.0,
+        timeout: float = 20.0,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.max_size = max_size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self.timeout = timeout
+        self._idle: Deque[_Conn] = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def _connect(self) -> _Conn:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return _Conn(smtp)
+
+    @staticmethod
+    def _close(conn: _Conn):
+        try:
+            conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    def _evict_idle_locked(self) -> List[_Conn]:
+        # Oldest idle sessions sit at the left end of the deque.
+        stale = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0].last_used < cutoff:
+            stale.append(self._idle.popleft())
+            self._open -= 1
+        return stale
+
+    def _acquire(self) -> _Conn:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                stale = self._evict_idle_locked()
+                conn = self._idle.pop() if self._idle else None
+                reserve = conn is None and self._open < self.max_size
+                if reserve:
+                    self._open += 1
+                elif conn is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"no SMTP connection to {self.host} available")
+                    self._cond.wait(timeout=remaining)
+            for c in stale:
+                self._close(c)
+            if reserve:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._discard(None)
+                    raise
+            if conn is None:
+                continue
+            if time.monotonic() - conn.last_used < self.noop_after:
+                return conn
+            try:
+                if conn.smtp.noop()[0] == 250:
+                    return conn
+            except _BROKEN:
+                pass
+            self._discard(conn)
+
+    def _release(self, conn: _Conn):
+        conn.last_used = time.monotonic()
+        if conn.sent >= self.max_messages:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn: Optional[_Conn]):
+        if conn is not None:
+            self._close(conn)
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[_Conn]:
+        conn = self._acquire()
+        try:
+            yield conn
+        except _BROKEN:
+            self._discard(conn)
+            raise
+        except Exception:
+            self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def send(self, from_addr: str, to_addrs: Sequence[str], msg: str):
+        with self.connection() as conn:
+            conn.smtp.sendmail(from_addr, list(to_addrs), msg)
+            conn.sent += 1
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for c in idle:
+            self._close(c)
+
+
+_pools: Dict[Tuple[str, int, str], SMTPPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host: Optional[str] = None, port: Optional[int] = None, user: Optional[str] = None, password: Optional[str] = None) -> SMTPPool:
+    """Return the shared pool for ``(host, port, user)``, defaulting to the configured SMTP account."""
+    host = settings.SMTP_HOST if host is None else host
+    port = settings.SMTP_PORT if port is None else port
+    user = settings.SMTP_USER if user is None else user
+    password = settings.SMTP_PASS if password is None else password
+    key = (host, port, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPPool(
+                host,
+                port,
+                user,
+                password,
+                starttls=settings.SMTP_STARTTLS,
+                max_size=settings.SMTP_POOL_SIZE,
+                max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+                noop_after=settings.SMTP_NOOP_AFTER_SECONDS,
+                timeout=settings.SMTP_TIMEOUT_SECONDS,
+            )
+        return pool
+
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        p.close()
@@ -0,0 +1,64 @@
+"""SQLite tuning for single-file deployments (the default ``sqlite:///reminders.db``).
+
+Every new connection gets the configured pragmas: WAL so readers never block the
+writer, ``synchronous=NORMAL`` (durable at checkpoints, safe against corruption
+under WAL), a busy timeout so lock waits queue instead of failing with
+"database is locked", a memory-mapped read path and a larger page cache.
+Applied to both the sync engine and the aiosqlite engine.
+"""
+from typing import Any, Dict, List
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, URL
+
+from app.config import settings
+
+
+def is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def is_file(url: URL) -> bool:
+    return url.database not in (None, "", ":memory:")
+
+
+def pragmas() -> List[str]:
+    out = [f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}"]
+    if settings.SQLITE_JOURNAL_MODE:
+        out.append(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+    if settings.SQLITE_SYNCHRONOUS:
+        out.append(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+    if settings.SQLITE_MMAP_SIZE:
+        out.append(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    if settings.SQLITE_CACHE_SIZE_KIB:
+        out.append(f"PRAGMA cache_size = -{int(settings.SQLITE_CACHE_SIZE_KIB)}")  # negative = KiB
+    out.append("PRAGMA temp_store = MEMORY")
+    return out
+
+
+def engine_kwargs(url: URL) -> Dict[str, Any]:
+    """Pool settings for a file database shared by API, dispatcher and writer threads.
+
+    Lock waits are configured once, by the ``busy_timeout`` pragma.
+    """
+    if not (is_sqlite(url) and is_file(url)):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "connect_args": {"check_same_thread": False},
+    }
+
+
+def install(engine: Engine):
+    """Run ``pragmas()`` on every new DBAPI connection of ``engine`` (pass ``sync_engine`` for async)."""
+    statements = pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for stmt in statements:
+                cursor.execute(stmt)
+        finally:
+            cursor.close()
@@ -0,0 +1,181 @@
+"""Message templates rendered at send time.
+
+A reminder can reference a stored template instead of carrying its own text:
+``reminder_metadata = {"template_id": "metformin", "vars": {"name": "Ann", "dose": "500 mg"}}``.
+Templates use ``{variable}`` placeholders (``{{``/``}}`` for literal braces); only
+plain names are allowed, so rendering is a ``str.format_map`` with no attribute
+or index lookups. Compiled templates are held in a bounded LRU with a TTL, so
+an edit made through the admin API reaches other processes within
+``TEMPLATE_CACHE_TTL_SECONDS``.
+"""
+import string
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.services import async_db, db
+from app.services.cache import LRUCache
+
+_FORMATTER = string.Formatter()
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _fields(text: str) -> FrozenSet[str]:
+    """Placeholder names in ``text``; raises TemplateError for anything but ``{name}``."""
+    names = set()
+    try:
+        parsed = list(_FORMATTER.parse(text))
+    except ValueError as e:
+        raise TemplateError(f"invalid template: {e}") from e
+    for _, field, spec, conversion in parsed:
+        if field is None:
+            continue
+        if not field.isidentifier() or spec or conversion:
+            raise TemplateError(f"invalid placeholder {{{field}}}: use plain {{name}} placeholders")
+        names.add(field)
+    return frozenset(names)
+
+
+class Template:
+    __slots__ = ("id", "title", "body", "variables", "updated_ts")
+
+    def __init__(self, id: str, title: str, body: str, updated_ts: int = 0):
+        self.id = id
+        self.title = title
+        self.body = body
+        self.variables = _fields(title) | _fields(body)
+        self.updated_ts = updated_ts
+
+    def check(self, values: Dict[str, Any]):
+        missing = self.variables.difference(values)
+        if missing:
+            raise TemplateError(f"template {self.id!r} needs variables: {', '.join(sorted(missing))}")
+
+    def render(self, values: Dict[str, Any]) -> Tuple[str, str]:
+        try:
+            return self.title.format_map(values), self.body.format_map(values)
+        except KeyError as e:
+            raise TemplateError(f"template {self.id!r} needs variable {e.args[0]!r}") from None
+
+
+_compiled = LRUCache("templates", max_size=settings.TEMPLATE_CACHE_SIZE, ttl=settings.TEMPLATE_CACHE_TTL_SECONDS)
+
+
+def _load(row: Dict[str, Any], since: int) -> Template:
+    tpl = Template(row["id"], row["title"], row["body"], row.get("updated_ts") or 0)
+    _compiled.set_if_fresh(tpl.id, tpl, since)
+    return tpl
+
+
+def _split(template_ids: Iterable[str]) -> Tuple[Dict[str, Template], List[str]]:
+    found: Dict[str, Template] = {}
+    missing: List[str] = []
+    for tid in set(template_ids):
+        tpl = _compiled.get(tid)
+        if tpl is None:
+            missing.append(tid)
+        else:
+            found[tid] = tpl
+    return found, missing
+
+
+def invalidate(template_id: str):
+    _compiled.delete(template_id)
+
+
+def get_many(template_ids: Iterable[str]) -> Dict[str, Template]:
+    """Compiled templates by id (cache first, one query for the misses); unknown ids are left out."""
+    since = _compiled.generation()
+    found, missing = _split(template_ids)
+    for tid, row in db.get_templates(missing).items():
+        found[tid] = _load(row, since)
+    return found
+
+
+async def get_many_async(template_ids: Iterable[str]) -> Dict[str, Template]:
+    since = _compiled.generation()
+    found, missing = _split(template_ids)
+    for tid, row in (await async_db.get_templates(missing)).items():
+        found[tid] = _load(row, since)
+    return found
+
+
+def get(template_id: str) -> Optional[Template]:
+    tpl = _compiled.get(template_id)
+    if tpl is None:
+        since = _compiled.generation()
+        row = db.get_templates([template_id]).get(template_id)
+        tpl = _load(row, since) if row is not None else None
+    return tpl
+
+
+def reference(metadata: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """``(template_id, vars)`` from a reminder's metadata; template_id is None for plain reminders."""
+    if not metadata:
+        return None, {}
+    return metadata.get("template_id"), metadata.get("vars") or {}
+
+
+def _apply(rem: Dict[str, Any], tpl: Template, values: Dict[str, Any]) -> Tuple[str, str]:
+    title, body = tpl.render(values)
+    return rem.get("title") or title, rem.get("message") or body
+
+
+def check(rem: Dict[str, Any], known: Dict[str, Template]):
+    """Raise TemplateError unless templated ``rem`` renders to a title and message.
+
+    ``known`` holds the compiled templates (see ``get_many``). Plain reminders pass;
+    their text is checked by the schema.
+    """
+    template_id, values = reference(rem.get("reminder_metadata"))
+    if not template_id:
+        return
+    tpl = known.get(template_id)
+    if tpl is None:
+        raise TemplateError(f"unknown template {template_id!r}")
+    tpl.check(values)
+    title, message = _apply(rem, tpl, values)
+    if not title.strip() or not message.strip():
+        raise TemplateError(f"template {template_id!r} renders an empty title or message")
+
+
+async def annotate_async(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add ``template_id`` and a rendered ``preview`` to templated reminder rows for API output.
+
+    Their stored title/message are empty (or just overrides), so clients would
+    otherwise see blank reminders. Rows whose template cannot render get no preview.
+    """
+    refs = [reference(r.get("reminder_metadata")) for r in rows]
+    known = await get_many_async(tid for tid, _ in refs if tid)
+    for row, (tid, values) in zip(rows, refs):
+        if not tid:
+            continue
+        row["template_id"] = tid
+        tpl = known.get(tid)
+        if tpl is None:
+            continue
+        try:
+            title, message = _apply(row, tpl, values)
+        except TemplateError:
+            continue
+        row["preview"] = {"title": title, "message": message}
+    return rows
+
+
+def render(rem: Dict[str, Any]) -> Tuple[str, str]:
+    """Title and message to send for ``rem``.
+
+    Plain reminders return their stored text. Templated ones render the template
+    with ``reminder_metadata.vars``; a non-empty stored title or message overrides
+    that part of the template. Raises TemplateError if the template is gone or a
+    variable is missing.
+    """
+    template_id, values = reference(rem.get("reminder_metadata"))
+    if not template_id:
+        return rem["title"], rem["message"]
+    tpl = get(template_id)
+    if tpl is None:
+        raise TemplateError(f"unknown template {template_id!r}")
+    return _apply(rem, tpl, values)
@@ -0,0 +1,20 @@
+import base64
+import json
+from typing import Tuple
+
+
+def encode_cursor(created_ts: int, rem_id: str) -> str:
+    """Opaque keyset cursor pointing just past ``(created_ts, id)``."""
+    raw = json.dumps([created_ts, rem_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_ts, rem_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(created_ts, int) or not isinstance(rem_id, str):
+        raise ValueError("invalid cursor")
+    return created_ts, rem_id
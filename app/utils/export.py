@@ -0,0 +1,22 @@
+"""Row encoders shared by the streaming export and the retention archive."""
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Sequence
+
+import orjson
+
+
+def ndjson(rows: Iterable[Dict[str, Any]]) -> bytes:
+    return b"".join(orjson.dumps(r, default=str) + b"\n" for r in rows)
+
+
+def csv_rows(rows: Iterable[Dict[str, Any]], fields: Sequence[str], header: bool = False) -> bytes:
+    """CSV lines for ``rows``; dict/list values (``reminder_metadata``) are written as JSON."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    for r in rows:
+        writer.writerow({k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in r.items()})
+    return buf.getvalue().encode()
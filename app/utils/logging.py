@@ -1,12 +1,19 @@
-
+from contextlib import contextmanager
 from contextvars import ContextVar
-from datetime import datetime, timezone
-import json
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+import atexit
 import logging
+import queue
 import sys
-import uuid
+import threading
+import time
+import orjson
+from app.utils import metrics
+from app.utils.ratelimit import parse_rate_limits
 
 _request_id: ContextVar[str] = ContextVar("request_id", default="-")
+_reminder_id: ContextVar[Optional[str]] = ContextVar("reminder_id", default=None)
 
 def get_request_id() -> str:
     return _request_id.get()
@@ -14,24 +21,162 @@ def get_request_id() -> str:
 def set_request_id(value: str):
     _request_id.set(value)
 
+def get_reminder_id() -> Optional[str]:
+    return _reminder_id.get()
+
+@contextmanager
+def reminder_context(rem_id: Optional[str]):
+    """Tag every record logged inside the block with ``reminder_id``."""
+    token = _reminder_id.set(rem_id)
+    try:
+        yield
+    finally:
+        _reminder_id.reset(token)
+
+# Attributes every LogRecord has; anything else on a record came from ``extra=``.
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "reminder_id", "taskName",
+}
+
 class JsonFormatter(logging.Formatter):
+    """One JSON object per line, serialized with orjson.
+
+    The timestamp is built from ``record.created`` with the per-second prefix cached,
+    and ``extra=`` fields are emitted as top-level keys.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._second: Tuple[int, str] = (-1, "")
+
+    def _timestamp(self, created: float) -> str:
+        sec = int(created)
+        cached = self._second
+        if cached[0] != sec:
+            cached = (sec, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec)))
+            self._second = cached
+        return f"{cached[1]}.{int((created - sec) * 1000):03d}Z"
+
     def format(self, record):
         data = {
-            "ts": datetime.now(timezone.utc).isoformat(),
+            "ts": self._timestamp(record.created),
             "level": record.levelname,
             "msg": record.getMessage(),
             "logger": record.name,
-            "request_id": get_request_id(),
+            "request_id": getattr(record, "request_id", None) or get_request_id(),
         }
-        if record.exc_info:
+        rem_id = getattr(record, "reminder_id", None) or _reminder_id.get()
+        if rem_id:
+            data["reminder_id"] = rem_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                data[key] = value
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        elif record.exc_info:
             data["exc_info"] = self.formatException(record.exc_info)
-        return json.dumps(data)
+        return orjson.dumps(data, default=str).decode()
+
+class _ContextFilter(logging.Filter):
+    """Captures context variables on the emitting thread, before the record is queued."""
+
+    def filter(self, record):
+        if getattr(record, "request_id", None) is None:
+            record.request_id = _request_id.get()
+        if getattr(record, "reminder_id", None) is None:
+            record.reminder_id = _reminder_id.get()
+        return True
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread; drops (and counts) them when the queue is full."""
 
-def configure_logging(level: str = "INFO"):
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JsonFormatter())
+    def prepare(self, record):
+        # Resolve args/exc_info here so the record is safe to pickle or hand off,
+        # but keep the message and traceback in separate fields for the formatter.
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.message = message, None, message
+        record.exc_info, record.exc_text, record.stack_info = None, exc_text, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message template for high-volume loggers.
+
+    WARNING and above always pass. The next record let through for a template
+    carries ``suppressed`` with the number dropped since the previous one.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                bucket[2] += 1
+                metrics.LOG_RECORDS_DROPPED.labels("rate_limited").inc()
+                return False
+            bucket[0] = tokens - 1.0
+            suppressed, bucket[2] = int(bucket[2]), 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+_listener: Optional[QueueListener] = None
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def configure_logging(level: str = "INFO", queue_size: int = 10000, rate_limits: str = ""):
+    """Route all logging through a queue to a single writer thread.
+
+    Callers only pay for building the record and a ``put_nowait``; formatting and
+    writing to stdout happen on the listener thread. ``queue_size`` 0 is unbounded.
+    """
+    global _listener
+    stop_logging()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+    handler = _NonBlockingQueueHandler(log_queue)
+    handler.addFilter(_ContextFilter())
     root = logging.getLogger()
     root.handlers.clear()
     root.addHandler(handler)
     root.setLevel(level.upper())
+    for name, (rate, burst) in parse_rate_limits(rate_limits).items():
+        logger = logging.getLogger(name)
+        for f in [f for f in logger.filters if isinstance(f, RateLimitFilter)]:
+            logger.removeFilter(f)
+        logger.addFilter(RateLimitFilter(rate, burst))
+    _listener = QueueListener(log_queue, stream)
+    _listener.start()
     return root
+
+atexit.register(stop_logging)
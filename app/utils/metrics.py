@@ -0,0 +1,101 @@
+"""Prometheus metrics shared across the app.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (one directory shared by all uvicorn
+workers), ``prometheus_client`` writes samples to per-process files and
+``render()`` aggregates them; gauges declare how their per-process values combine.
+"""
+import os
+from typing import Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess, start_http_server
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# HTTP (labelled by route template, e.g. /reminders/{rem_id}, never the raw path)
+REQUESTS = Counter("http_requests_total", "Total HTTP requests", ["method", "path", "status"])
+LATENCY = Histogram("http_request_duration_seconds", "Request latency", ["method", "path"])
+
+# Delivery pipeline
+DELIVERY_QUEUE_DEPTH = Gauge("delivery_queue_depth", "Deliveries waiting for a worker", ["channel"], multiprocess_mode="livesum")
+DELIVERY_IN_FLIGHT = Gauge("delivery_in_flight", "Deliveries currently being sent", ["channel"], multiprocess_mode="livesum")
+DELIVERY_RETRY_PENDING = Gauge("delivery_retry_pending", "Deliveries waiting out a retry delay", ["channel"], multiprocess_mode="livesum")
+DELIVERY_ENQUEUED = Counter("delivery_enqueued_total", "Deliveries accepted into the queue", ["channel"])
+DELIVERY_REJECTED = Counter("delivery_rejected_total", "Deliveries refused because the queue was full", ["channel"])
+DELIVERY_RETRIES = Counter("delivery_retries_total", "Delivery attempts re-enqueued after an error", ["channel"])
+DELIVERY_RESULTS = Counter("delivery_results_total", "Finished deliveries by outcome", ["channel", "result"])
+DELIVERY_THROTTLED = Counter("delivery_throttled_total", "Sends held back by rate limits or low-priority spreading", ["channel", "reason"])
+DIGEST_PENDING = Gauge("delivery_digest_pending", "Reminders held for their digest window", multiprocess_mode="livesum")
+DIGEST_SIZE = Histogram(
+    "delivery_digest_size",
+    "Reminders merged into one digest message",
+    ["channel"],
+    buckets=(2, 3, 4, 5, 8, 10, 16, 32),
+)
+SEND_LATENCY = Histogram(
+    "delivery_send_duration_seconds",
+    "Time spent in a single provider send attempt",
+    ["channel"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20),
+)
+OUTBOX_PENDING = Gauge("outbox_pending", "Delivery outcomes waiting for the next outbox flush", multiprocess_mode="livesum")
+OUTBOX_WRITTEN = Counter("outbox_written_total", "Rows written by outbox flushes", ["kind"])
+OUTBOX_DROPPED = Counter("outbox_dropped_total", "Outbox rows dropped because they could not be written", ["kind"])
+
+# Scheduling
+DUE_BACKLOG = Gauge("reminders_due_backlog", "Scheduled reminders already past their delivery_time", multiprocess_mode="max")
+DISPATCH_LAG = Histogram(
+    "reminder_dispatch_lag_seconds",
+    "Actual send time minus delivery_time",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900),
+)
+
+# Database
+GROUP_COMMIT_BATCH = Histogram(
+    "db_group_commit_batch_size",
+    "Writes committed together by the SQLite group-commit writer",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+# Retention
+RETENTION_ROWS = Counter("retention_rows_total", "Rows handled by the retention purge", ["action"])
+RETENTION_RUN_ROWS = Gauge("retention_run_rows", "Rows matched so far by the current (or last) purge run", multiprocess_mode="max")
+RETENTION_LAST_SUCCESS = Gauge("retention_last_success_timestamp_seconds", "When a purge run last completed", multiprocess_mode="max")
+
+# Stage timing (utils.tracing; only populated with TRACING_ENABLED)
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds",
+    "Time spent in an instrumented lifecycle stage",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# Caches
+CACHE_HITS = Counter("cache_hits_total", "Cache lookups served from the cache", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "Cache lookups that fell through", ["cache"])
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries evicted to stay within the size bound", ["cache"])
+CACHE_SIZE = Gauge("cache_entries", "Entries currently cached", ["cache"], multiprocess_mode="livesum")
+
+# Logging
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records discarded before being written", ["reason"])
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition payload for ``/metrics``, aggregated across workers in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def serve(port: int):
+    """Expose metrics on their own HTTP port, for processes without an API (the standalone dispatcher)."""
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+
+
+def mark_process_dead():
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
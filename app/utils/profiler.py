@@ -0,0 +1,72 @@
+"""On-demand sampling profiler for a running process.
+
+Samples every thread's Python stack via ``sys._current_frames()`` at a fixed
+interval. Nothing is installed in the interpreter, so the process only pays
+while a profile is being taken. Output is the folded-stack format understood by
+flamegraph.pl and speedscope, or a JSON summary of the hottest functions.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being taken."""
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample(seconds: float, interval: float = 0.005, max_depth: int = 64) -> Counter:
+    """Folded stacks (root first, ``;``-joined, prefixed with the thread name) -> sample count."""
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                parts: List[str] = []
+                while frame is not None and len(parts) < max_depth:
+                    parts.append(_frame_name(frame))
+                    frame = frame.f_back
+                parts.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(parts))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def summary(stacks: Counter, top: int = 30) -> Dict[str, Any]:
+    """Hottest functions by self samples (leaf frame) and by total samples (anywhere on the stack)."""
+    total = sum(stacks.values())
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        self_counts[frames[-1]] += count
+        for name in set(frames):
+            total_counts[name] += count
+    return {
+        "samples": total,
+        "self": [{"frame": k, "samples": v} for k, v in self_counts.most_common(top)],
+        "total": [{"frame": k, "samples": v} for k, v in total_counts.most_common(top)],
+    }
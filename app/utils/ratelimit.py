@@ -0,0 +1,94 @@
+"""Token buckets for pacing outbound deliveries."""
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """``rate`` tokens per second up to ``burst``; ``rate <= 0`` means unlimited.
+
+    ``take()`` spends a token and returns 0, or returns how long until one is
+    available without spending anything, so callers decide whether to wait or park.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _fill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def take(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._fill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def refund(self):
+        """Give back a token taken for a send that did not happen."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1.0)
+
+
+class KeyedTokenBuckets:
+    """One ``TokenBucket`` per key (e.g. recipient), keeping at most ``max_keys``.
+
+    The least recently used bucket is dropped first; a recipient idle long enough
+    to be evicted would have a full bucket anyway.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    def take(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        return self.get(key).take()
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, Optional[float]]]:
+    """``"email=50:100,sms=10"`` -> {key: (rate, burst)}; burst is None when not given.
+
+    Keys are delivery channels for ``DELIVERY_RATE_LIMITS`` and logger names for
+    ``LOG_RATE_LIMITS``.
+    """
+    limits: Dict[str, Tuple[float, Optional[float]]] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        limits[name.strip()] = (float(rate), float(burst) if burst else None)
+    return limits
+
+
+def spread_offset(key: str, window: float) -> float:
+    """Stable offset in ``[0, window)`` for ``key``, so a burst of keys is spread evenly."""
+    if window <= 0:
+        return 0.0
+    return (zlib.crc32(key.encode()) % 10_000) / 10_000 * window
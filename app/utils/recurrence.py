@@ -0,0 +1,37 @@
+"""Cron-based recurrence for reminders.
+
+A recurring reminder stores its rule once (``recurrence`` as a 5-field crontab,
+evaluated in the reminder's ``timezone``) and keeps ``delivery_time`` pointed at
+the next occurrence only; later occurrences are computed when the current one
+completes.
+"""
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from apscheduler.triggers.cron import CronTrigger
+
+_TICK = timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=1024)
+def parse(expr: str, tz: str = "UTC") -> CronTrigger:
+    """Compiled trigger for ``expr`` in ``tz``; raises ValueError for a bad expression or timezone."""
+    try:
+        return CronTrigger.from_crontab(expr, timezone=tz)
+    except ValueError:
+        raise
+    except Exception as e:  # unknown timezone names raise ZoneInfoNotFoundError (a KeyError)
+        raise ValueError(f"invalid recurrence {expr!r} in timezone {tz!r}: {e}") from e
+
+
+def first_occurrence(expr: str, tz: str, start: datetime, end: Optional[datetime] = None) -> Optional[datetime]:
+    """First occurrence at or after ``start`` (in UTC), or None if there is none before ``end``."""
+    fire = parse(expr, tz).get_next_fire_time(None, start)
+    if fire is None or (end is not None and fire > end):
+        return None
+    return fire.astimezone(timezone.utc)
+
+
+def next_occurrence(expr: str, tz: str, previous: datetime, now: datetime, end: Optional[datetime] = None) -> Optional[datetime]:
+    """Occurrence after ``previous``, skipping any that already passed by ``now``."""
+    return first_occurrence(expr, tz, max(previous + _TICK, now), end)
@@ -0,0 +1,12 @@
+from typing import Any
+import orjson
+from starlette.responses import Response
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson, for handlers returning rows that are already output-shaped."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
@@ -1,8 +1,11 @@
 import hmac
 import hashlib
+import time
+from typing import Any, Dict
 from fastapi import Header, HTTPException, Depends
 from jose import jwt, JWTError
 from app.config import settings
+from app.services.cache import LRUCache
 
 class User:
     def __init__(self, user_id: str, role: str, username: str = ""):
@@ -10,7 +13,67 @@ class User:
         self.role = role        # user/admin
         self.username = username  # optional display name
 
-def get_current_user(authorization: str = Header(default=None, alias="Authorization")) -> User:
+
+class InvalidToken(Exception):
+    pass
+
+
+def _decode_jose(token: str) -> Dict[str, Any]:
+    try:
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+    except JWTError as e:
+        raise InvalidToken(str(e)) from e
+
+
+def _select_decoder():
+    # PyJWT is optional; it verifies the same HS*/RS* tokens with less overhead.
+    if settings.JWT_BACKEND == "pyjwt":
+        import jwt as pyjwt
+
+        def _decode_pyjwt(token: str) -> Dict[str, Any]:
+            try:
+                return pyjwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+            except pyjwt.PyJWTError as e:
+                raise InvalidToken(str(e)) from e
+
+        return _decode_pyjwt
+    return _decode_jose
+
+
+_decode = _select_decoder()
+
+# Verified tokens keyed by SHA-256 digest, each kept until its own ``exp``.
+_token_cache = LRUCache("auth_tokens", max_size=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_TOKEN_CACHE_MAX_TTL_SECONDS)
+
+
+def _verify(token: str) -> User:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    user = _token_cache.get(key)
+    if user is not None:
+        return user
+    payload = _decode(token)
+
+    # Always present
+    user_id = payload.get("sub")
+    role = payload.get("role", "user")
+
+    # Optional field
+    username = payload.get("username") or ""
+
+    if not user_id:
+        raise InvalidToken("missing sub")
+
+    user = User(user_id=user_id, role=role, username=username)
+    if settings.AUTH_TOKEN_CACHE_SIZE > 0:
+        ttl = settings.AUTH_TOKEN_CACHE_MAX_TTL_SECONDS
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            _token_cache.set(key, user, ttl=ttl)
+    return user
+
+async def get_current_user(authorization: str = Header(default=None, alias="Authorization")) -> User:
     if not authorization:
         raise HTTPException(
             status_code=401,
@@ -33,28 +96,16 @@ def get_current_user(authorization: str = Header(default=None, alias="Authorizat
         )
 
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
-
-        # Always present
-        user_id = payload.get("sub")
-        role = payload.get("role", "user")
-
-        # Optional field
-        username = payload.get("username") or ""
-
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        return User(user_id=user_id, role=role, username=username)
-    except JWTError:
+        return _verify(token)
+    except InvalidToken:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
+async def require_admin(user: User = Depends(get_current_user)) -> User:
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Forbidden")
     return user
 
-def require_user(user: User = Depends(get_current_user)) -> User:
+async def require_user(user: User = Depends(get_current_user)) -> User:
     return user
 
 def verify_hmac_signature(raw_body: bytes, signature_header: str) -> bool:
@@ -1,5 +1,5 @@
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 def now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -9,3 +9,18 @@ def parse_iso_utc(v: str) -> datetime:
         v = v.replace("Z", "+00:00")
     dt = datetime.fromisoformat(v)
     return dt.astimezone(timezone.utc)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MS = timedelta(milliseconds=1)
+
+def to_epoch_ms(dt: datetime) -> int:
+    return (dt.astimezone(timezone.utc) - _EPOCH) // _MS
+
+def iso_to_epoch_ms(v: str) -> int:
+    return to_epoch_ms(parse_iso_utc(v))
+
+def epoch_ms_to_iso(ms: int) -> str:
+    return (_EPOCH + ms * _MS).isoformat()
+
+def now_epoch_ms() -> int:
+    return to_epoch_ms(datetime.now(timezone.utc))
@@ -0,0 +1,117 @@
+"""Stage timing and tracing hooks for the reminder lifecycle.
+
+``traced(stage)`` wraps a function and ``span(stage)`` a block. With
+``TRACING_ENABLED`` off (the default), ``traced`` returns the function unchanged
+and ``span`` returns a shared no-op, so instrumented code pays nothing. When on,
+every stage is timed into the ``stage_duration_seconds{stage}`` histogram and,
+if OpenTelemetry is installed, recorded as a span tagged with the request and
+reminder ids from ``utils.logging``. ``TRACING_EXPORTER=otlp`` also sets up the
+OpenTelemetry SDK with an OTLP/HTTP exporter (``opentelemetry-sdk`` and
+``opentelemetry-exporter-otlp-proto-http`` must be installed).
+"""
+import functools
+import inspect
+import logging
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from app.config import settings
+from app.utils import metrics
+from app.utils.logging import get_reminder_id, get_request_id
+
+log = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+ENABLED = settings.TRACING_ENABLED
+
+
+def _setup_tracer() -> Optional[Any]:
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    if settings.TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            log.warning("TRACING_EXPORTER=otlp needs opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http")
+        else:
+            provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)))
+            trace.set_tracer_provider(provider)
+    elif settings.TRACING_EXPORTER:
+        log.warning("unknown TRACING_EXPORTER %r; spans stay local", settings.TRACING_EXPORTER)
+    return trace.get_tracer("app")
+
+
+_tracer = _setup_tracer() if ENABLED else None
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "attrs", "_start", "_otel")
+
+    def __init__(self, stage: str, attrs: dict):
+        self.stage = stage
+        self.attrs = attrs
+        self._otel = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            attrs = {"request_id": get_request_id(), **self.attrs}
+            rem_id = get_reminder_id()
+            if rem_id:
+                attrs.setdefault("reminder_id", rem_id)
+            self._otel = _tracer.start_as_current_span(self.stage, attributes=attrs)
+            self._otel.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics.STAGE_DURATION.labels(self.stage).observe(time.perf_counter() - self._start)
+        if self._otel is not None:
+            self._otel.__exit__(exc_type, exc, tb)
+        return False
+
+
+def span(stage: str, **attrs: Any):
+    """Context manager timing one stage; a shared no-op when tracing is disabled."""
+    if not ENABLED:
+        return _NOOP
+    return _Span(stage, attrs)
+
+
+def traced(stage: str) -> Callable[[F], F]:
+    """Decorator form of ``span``; works on sync and async functions."""
+    def decorate(fn: F) -> F:
+        if not ENABLED:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Span(stage, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(stage, {}):
+                return fn(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
@@ -0,0 +1,73 @@
+"""API throughput and latency through the real ``app.main:app`` (in-process ASGI).
+
+Creates, reads, lists and cancels ``--requests`` reminders with ``--concurrency``
+requests in flight, and reports per-operation throughput and latency percentiles.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+from bench.common import parser, percentiles, write_result
+
+
+async def _phase(n: int, concurrency: int, op: Callable[[int], Awaitable[httpx.Response]]) -> Dict[str, Any]:
+    sem = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            r = await op(i)
+            samples.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    return {"ops": n, "errors": errors, "seconds": round(elapsed, 4), "ops_per_sec": round(n / elapsed, 1), "latency": percentiles(samples)}
+
+
+async def run(n: int, concurrency: int, page_size: int) -> Dict[str, Any]:
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+            tok = (await c.post("/auth/token", json={"username": "areesha", "password": "1234"})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {tok}"}
+            when = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+            ids: List[str] = [""] * n
+
+            async def create(i: int):
+                r = await c.post("/reminders", json={"title": f"bench {i}", "message": "m", "delivery_time": when}, headers=headers)
+                if r.status_code == 200:
+                    ids[i] = r.json()["id"]
+                return r
+
+            results = {"create": await _phase(n, concurrency, create)}
+            uid = (await c.get(f"/reminders/{ids[0]}", headers=headers)).json()["user_id"]
+            results["get"] = await _phase(n, concurrency, lambda i: c.get(f"/reminders/{ids[i]}", headers=headers))
+            pages = max(1, n // page_size)
+            results["list"] = await _phase(pages, concurrency, lambda i: c.get(f"/users/{uid}/reminders", params={"limit": page_size}, headers=headers))
+            results["cancel"] = await _phase(n, concurrency, lambda i: c.post(f"/reminders/{ids[i]}/cancel", headers=headers))
+    return results
+
+
+def main():
+    p = parser(__doc__.splitlines()[0])
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--page-size", type=int, default=50)
+    args = p.parse_args()
+    results = asyncio.run(run(args.requests, args.concurrency, args.page_size))
+    write_result(args.out, {"params": {"requests": args.requests, "concurrency": args.concurrency, "page_size": args.page_size}, "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Helpers shared by the benchmark cases.
+
+Every case runs in its own interpreter (the app binds its engines to
+``DATABASE_URL`` at import time), writes one JSON object to ``--out`` and never
+touches real providers: SMTP/Twilio credentials are blanked so ``delivery`` takes
+its fake paths.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Sequence
+from uuid import uuid4
+
+# Offline, quiet defaults; must be set before anything under ``app`` is imported.
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+for _var in ("SMTP_USER", "SMTP_PASS", "TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_FROM"):
+    os.environ[_var] = ""
+
+SEED_CHUNK = 10_000
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description=description)
+    p.add_argument("--out", required=True, help="write the JSON result here")
+    return p
+
+
+def write_result(path: str, result: Dict[str, Any]):
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds (nearest-rank percentiles)."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(n - 1, max(0, int(q * n + 0.5) - 1))] * 1000, 3)
+
+    return {
+        "count": n,
+        "mean_ms": round(sum(ordered) / n * 1000, 3),
+        "p50_ms": rank(0.50),
+        "p90_ms": rank(0.90),
+        "p99_ms": rank(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def reminder_rows(n: int, user_ids: Sequence[str], due_fraction: float = 0.0, status: str = "scheduled") -> List[Dict[str, Any]]:
+    """``n`` reminder records spread over ``user_ids``; ``due_fraction`` of them are already overdue."""
+    now = datetime.now(timezone.utc)
+    due = int(n * due_fraction)
+    rows = []
+    for i in range(n):
+        delivery = now - timedelta(seconds=60 + i % 600) if i < due else now + timedelta(days=1, seconds=i)
+        rows.append({
+            "id": str(uuid4()),
+            "user_id": user_ids[i % len(user_ids)],
+            "title": f"bench {i}",
+            "message": "benchmark reminder",
+            "delivery_time": delivery.isoformat(),
+            "timezone": "UTC",
+            "method": "email" if i % 2 == 0 else "sms",
+            "reminder_metadata": {},
+            "created_at": (now - timedelta(seconds=n - i)).isoformat(),
+            "status": status,
+        })
+    return rows
+
+
+def seed(n: int, user_ids: Sequence[str], due_fraction: float = 0.0) -> float:
+    """Bulk-insert ``n`` reminders in chunks; returns seconds taken."""
+    from app.services import db
+
+    start = time.perf_counter()
+    done = 0
+    while done < n:
+        chunk = min(SEED_CHUNK, n - done)
+        db.insert_reminders(reminder_rows(chunk, user_ids, due_fraction))
+        done += chunk
+    return time.perf_counter() - start
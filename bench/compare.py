@@ -0,0 +1,61 @@
+"""Compare two ``bench.run`` reports: ``python -m bench.compare old.json new.json``.
+
+Prints every shared throughput/latency figure with its relative change; rates
+(``*_per_sec``) are better when higher, times (``*_ms``, ``*_seconds``) when lower.
+"""
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+_RATE = ("_per_sec",)
+_TIME = ("_ms", "_seconds")
+
+
+def _flatten(node: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for k, v in node.items():
+            yield from _flatten(v, f"{prefix}.{k}" if prefix else k)
+    elif isinstance(node, list):
+        for i, v in enumerate(node):
+            key = f"rows={v['rows']}" if isinstance(v, dict) and "rows" in v else str(i)
+            yield from _flatten(v, f"{prefix}[{key}]")
+    elif isinstance(node, (int, float)) and not isinstance(node, bool) and prefix.endswith(_RATE + _TIME):
+        yield prefix, float(node)
+
+
+def _metrics(report: Dict[str, Any]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for run in report.get("runs", []):
+        if "results" in run:
+            for key, value in _flatten(run["results"]):
+                out[f"{run['backend']}/{run['case']}/{key}"] = value
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="flag changes worse than this fraction")
+    args = p.parse_args()
+    with open(args.old) as f:
+        old = _metrics(json.load(f))
+    with open(args.new) as f:
+        new = _metrics(json.load(f))
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if key.endswith(_RATE) else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:80s} {before:12.3f} -> {after:12.3f}  {change:+7.1%}{flag}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Dispatch throughput: ``_check_due_fallback`` draining N overdue reminders.
+
+Seeds ``--overdue`` reminders already past their delivery time, starts the
+delivery pool (fake email/SMS senders) and times one fallback pass until every
+reminder has reached a final status.
+"""
+import time
+from typing import Any, Dict
+
+from bench.common import parser, seed, write_result
+
+
+def run(n: int, timeout: float) -> Dict[str, Any]:
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+
+    from app.services import db, delivery, scheduler
+
+    seed_seconds = seed(n, [f"bench-user-{i}" for i in range(100)], due_fraction=1.0)
+
+    def finished() -> int:
+        with Session(db.engine) as s:
+            return s.scalar(select(func.count()).select_from(db.Reminder).where(db.Reminder.status.in_(("sent", "failed")))) or 0
+
+    delivery.pool.start()
+    try:
+        start = time.perf_counter()
+        scheduler._check_due_fallback()
+        claimed = time.perf_counter() - start
+        done = finished()
+        while done < n and time.perf_counter() - start < timeout:
+            # The fallback stops claiming when the delivery queue pushes back; keep draining.
+            scheduler._check_due_fallback()
+            time.sleep(0.05)
+            done = finished()
+        elapsed = time.perf_counter() - start
+    finally:
+        delivery.pool.stop()
+    return {
+        "seed_seconds": round(seed_seconds, 3),
+        "first_pass_seconds": round(claimed, 4),
+        "delivered": done,
+        "seconds": round(elapsed, 4),
+        "reminders_per_sec": round(done / elapsed, 1) if elapsed else None,
+        "timed_out": done < n,
+    }
+
+
+def main():
+    p = parser(__doc__.splitlines()[0])
+    p.add_argument("--overdue", type=int, default=10_000)
+    p.add_argument("--timeout", type=float, default=600.0)
+    args = p.parse_args()
+    write_result(args.out, {"params": {"overdue": args.overdue}, "results": run(args.overdue, args.timeout)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Query cost at scale: ``fetch_due`` and ``list_reminders`` as the table grows.
+
+Grows one table through each size in ``--sizes`` (1% of rows overdue, spread
+over ``--users`` users) and times the due scan plus first-page, cursor-page and
+offset-page listings at every step.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+from bench.common import parser, percentiles, seed, timed, write_result
+
+
+def run(sizes: List[int], users: int, repeat: int, page_size: int) -> List[Dict[str, Any]]:
+    from app.services import async_db, db
+    from app.utils.time import now_utc_iso
+
+    user_ids = [f"bench-user-{i}" for i in range(users)]
+    loop = asyncio.new_event_loop()
+    steps = []
+    total = 0
+    for size in sorted(sizes):
+        seed_seconds = seed(size - total, user_ids, due_fraction=0.01)
+        total = size
+        now = now_utc_iso()
+        user = user_ids[0]
+        _, cursor = loop.run_until_complete(async_db.list_reminders(user, limit=page_size))
+        deep_offset = max(0, size // users - page_size)
+        steps.append({
+            "rows": size,
+            "seed_seconds": round(seed_seconds, 3),
+            "due_rows": len(db.fetch_due(now)),
+            "fetch_due": percentiles(timed(lambda: db.fetch_due(now), repeat)),
+            "list_first_page": percentiles(timed(lambda: db.list_reminders(user, limit=page_size), repeat)),
+            "list_cursor_page": percentiles(timed(
+                lambda: loop.run_until_complete(async_db.list_reminders(user, limit=page_size, cursor=cursor)), repeat
+            )),
+            "list_deep_offset": percentiles(timed(lambda: db.list_reminders(user, limit=page_size, offset=deep_offset), repeat)),
+        })
+    loop.run_until_complete(async_db.dispose())
+    loop.close()
+    return steps
+
+
+def main():
+    p = parser(__doc__.splitlines()[0])
+    p.add_argument("--sizes", default="10000,100000", help="comma-separated row counts, e.g. 10000,100000,1000000,10000000")
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--page-size", type=int, default=50)
+    args = p.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    write_result(args.out, {
+        "params": {"sizes": sizes, "users": args.users, "repeat": args.repeat, "page_size": args.page_size},
+        "results": run(sizes, args.users, args.repeat, args.page_size),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Shared setup: a throwaway SQLite database and a reminder factory.
+
+The app binds its engines to ``DATABASE_URL`` at import time, so the environment
+is set here, before anything under ``app`` is imported by a test module.
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+from uuid import uuid4
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="reminders-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+for _var in ("SMTP_USER", "SMTP_PASS", "TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_FROM"):
+    os.environ[_var] = ""
+
+
+@pytest.fixture
+def make_reminder():
+    """Insert a reminder and return its record; keyword arguments override the defaults."""
+    from app.services import db
+
+    def make(**fields: Any) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        rec = {
+            "id": str(uuid4()),
+            "user_id": f"user-{uuid4().hex[:8]}",
+            "title": "Take your medication",
+            "message": "500 mg with water",
+            "delivery_time": (now - timedelta(minutes=1)).isoformat(),
+            "timezone": "UTC",
+            "method": "email",
+            "reminder_metadata": {},
+            "created_at": now.isoformat(),
+            "status": "scheduled",
+            "priority": 1,
+            **fields,
+        }
+        db.insert_reminder(rec)
+        return rec
+
+    return make
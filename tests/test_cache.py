@@ -0,0 +1,50 @@
+from app.services import db
+from app.services.cache import LRUCache
+
+
+def test_set_if_fresh_stores_when_nothing_changed():
+    cache = LRUCache("test-fresh", max_size=10)
+    since = cache.generation()
+    assert cache.set_if_fresh("a", 1, since)
+    assert cache.get("a") == 1
+
+
+def test_set_if_fresh_refuses_after_invalidation():
+    cache = LRUCache("test-stale", max_size=10)
+    since = cache.generation()
+    # A writer invalidates "a" between the read and the store.
+    cache.delete("a")
+    assert not cache.set_if_fresh("a", "stale", since)
+    assert cache.get("a") is None
+    # Other keys are unaffected, and a read started after the write may store.
+    assert cache.set_if_fresh("b", 2, since)
+    assert cache.set_if_fresh("a", "fresh", cache.generation())
+    assert cache.get("a") == "fresh"
+
+
+def test_set_if_fresh_refuses_after_clear_and_eviction():
+    cache = LRUCache("test-floor", max_size=2)
+    since = cache.generation()
+    cache.clear()
+    assert not cache.set_if_fresh("a", 1, since)
+
+    since = cache.generation()
+    # More invalidations than the cache tracks: the oldest are only known by the floor.
+    for key in ("x", "y", "z"):
+        cache.delete(key)
+    assert not cache.set_if_fresh("x", 1, since)
+
+
+def test_read_through_does_not_cache_a_row_updated_meanwhile(make_reminder, monkeypatch):
+    rem = make_reminder()
+    real_set_if_fresh = db._cache.set_if_fresh
+
+    def update_then_store(key, value, since, ttl=None):
+        # The update commits after get() read the row but before it stores it.
+        monkeypatch.undo()
+        db.update_reminder(rem["id"], {"title": "Updated"})
+        return real_set_if_fresh(key, value, since, ttl)
+
+    monkeypatch.setattr(db._cache, "set_if_fresh", update_then_store)
+    assert db.get(rem["id"])["title"] == rem["title"]
+    assert db.get(rem["id"])["title"] == "Updated"
@@ -0,0 +1,71 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.services import db
+from app.utils.time import now_epoch_ms, to_epoch_ms
+
+
+def _due_at(minute: int):
+    """A delivery time in 2000, so claim_due(upto_ms) only sees this test's reminders."""
+    return datetime(2000, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=minute)
+
+
+def test_claim_is_exclusive(make_reminder):
+    rem = make_reminder()
+    assert db.claim(rem["id"], "node-a", 60)["lease_owner"] == "node-a"
+    assert db.claim(rem["id"], "node-b", 60) is None
+    assert db.get(rem["id"])["status"] == "sending"
+
+
+def test_concurrent_claim_due_takes_disjoint_pages(make_reminder):
+    due = _due_at(1)
+    ids = {make_reminder(delivery_time=due.isoformat())["id"] for _ in range(40)}
+    claimed = {}
+    start = threading.Barrier(4)
+
+    def claim_all(owner):
+        start.wait()
+        got = []
+        while True:
+            rows = db.claim_due(owner, to_epoch_ms(due), lease_seconds=60, limit=7)
+            if not rows:
+                break
+            got.extend(r["id"] for r in rows)
+        claimed[owner] = got
+
+    threads = [threading.Thread(target=claim_all, args=(f"node-{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    every = [rid for got in claimed.values() for rid in got]
+    assert len(every) == len(set(every))
+    assert set(every) == ids
+
+
+def test_expired_lease_is_reclaimed(make_reminder):
+    due = _due_at(2)
+    rem = make_reminder(delivery_time=due.isoformat())
+    assert [r["id"] for r in db.claim_due("node-a", to_epoch_ms(due), lease_seconds=60)] == [rem["id"]]
+
+    db.reclaim_expired_leases(now_epoch_ms())
+    assert db.get(rem["id"])["status"] == "sending"
+    assert db.reclaim_expired_leases(now_epoch_ms() + 61_000) >= 1
+    assert db.get(rem["id"])["status"] == "scheduled"
+
+    # node-a's late outcome no longer applies; the new owner's does.
+    assert db.claim(rem["id"], "node-b", 60)
+    assert db.write_outcomes("node-a", [{"id": rem["id"], "status": "sent"}]) == []
+    assert db.write_outcomes("node-b", [{"id": rem["id"], "status": "sent"}]) == [rem["id"]]
+
+
+def test_extended_lease_is_not_reclaimed(make_reminder):
+    rem = make_reminder()
+    assert db.claim(rem["id"], "node-a", 1)
+    assert db.extend_leases([rem["id"]], "node-a", 60) == 1
+    assert db.extend_leases([rem["id"]], "node-b", 600) == 0
+    db.reclaim_expired_leases(now_epoch_ms() + 30_000)
+    assert db.get(rem["id"])["status"] == "sending"
+    db.reclaim_expired_leases(now_epoch_ms() + 61_000)
+    assert db.get(rem["id"])["status"] == "scheduled"
@@ -0,0 +1,95 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.services import db
+from app.services.db import DeliveryAttempt
+from app.services.outbox import OutboxWriter, attempt_key
+
+
+def _entry(rem, status="sent", **extra):
+    return {"id": rem["id"], "status": status, "occurrence_ts": None, "next_delivery": None, **extra}
+
+
+def test_unwritable_outcome_is_dropped_after_retries(make_reminder):
+    good, bad = make_reminder(), make_reminder()
+    for rem in (good, bad):
+        assert db.claim(rem["id"], "node-a", 60)
+    writer = OutboxWriter(max_retries=2)
+    outcomes = {}
+
+    def on_committed(rem_id):
+        return lambda done: outcomes.__setitem__(rem_id, done)
+
+    # Not JSON serialisable: every transaction holding this entry fails.
+    writer.complete("node-a", _entry(bad, reminder_metadata={"digest_id": object()}), on_committed(bad["id"]))
+    assert outcomes == {}
+    # The second failed flush writes the entries one by one.
+    writer.complete("node-a", _entry(good), on_committed(good["id"]))
+
+    assert outcomes == {good["id"]: True, bad["id"]: False}
+    assert db.get(good["id"])["status"] == "sent"
+    assert db.get(bad["id"])["status"] == "sending"
+    writer.flush()
+    assert writer._completions == [] and writer._attempts == []
+
+
+def _attempt(rem, attempt=1, status="sent"):
+    return {
+        "idempotency_key": attempt_key(rem, attempt),
+        "reminder_id": rem["id"],
+        "occurrence_ts": rem.get("delivery_ts"),
+        "attempt": attempt,
+        "channel": "email",
+        "status": status,
+        "error": None,
+        "node": "node-a",
+        "started_ts": 1,
+        "finished_ts": 2,
+    }
+
+
+def _attempt_rows(rem_ids):
+    with Session(db.engine) as s:
+        return s.execute(
+            select(DeliveryAttempt.idempotency_key, DeliveryAttempt.status).where(DeliveryAttempt.reminder_id.in_(rem_ids))
+        ).all()
+
+
+def test_outcomes_are_coalesced_into_one_transaction(make_reminder, monkeypatch):
+    rems = [make_reminder() for _ in range(5)]
+    for rem in rems:
+        assert db.claim(rem["id"], "node-a", 60)
+    calls = []
+    real_write = db.write_outcomes
+
+    def counting_write(owner, completions, attempts=None):
+        calls.append((owner, len(completions), len(attempts or [])))
+        return real_write(owner, completions, attempts)
+
+    monkeypatch.setattr(db, "write_outcomes", counting_write)
+    writer = OutboxWriter(flush_interval=60, max_batch=100)
+    writer.start()
+    for rem in rems:
+        writer.record_attempt(_attempt(rem))
+        writer.complete("node-a", _entry(rem))
+    writer.stop()
+
+    assert calls == [("node-a", 5, 5)]
+    assert {db.get(r["id"])["status"] for r in rems} == {"sent"}
+    assert len(_attempt_rows([r["id"] for r in rems])) == 5
+
+
+def test_attempt_keys_are_idempotent(make_reminder):
+    rem = make_reminder()
+    assert attempt_key(rem, 1) == attempt_key(dict(rem), 1)
+    assert attempt_key(rem, 1) != attempt_key(rem, 2)
+    # The next occurrence of a recurring reminder starts a new set of keys.
+    assert attempt_key({**rem, "delivery_ts": 1000}, 1) != attempt_key({**rem, "delivery_ts": 2000}, 1)
+
+    writer = OutboxWriter()
+    writer.record_attempt(_attempt(rem, status="sent"))
+    # Re-sent after a lost outcome: the same key is not logged twice.
+    writer.record_attempt(_attempt(rem, status="failed"))
+    writer.record_attempt(_attempt(rem, attempt=2, status="failed"))
+
+    assert sorted(_attempt_rows([rem["id"]])) == [(attempt_key(rem, 1), "sent"), (attempt_key(rem, 2), "failed")]
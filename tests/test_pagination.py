@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.services import async_db, db
+
+
+def _pages(user_id, limit):
+    async def walk():
+        seen, cursor = [], None
+        try:
+            while True:
+                rows, cursor = await async_db.list_reminders(user_id, limit=limit, cursor=cursor)
+                seen.extend(r["id"] for r in rows)
+                if cursor is None:
+                    return seen
+        finally:
+            await async_db.dispose()
+
+    return asyncio.run(walk())
+
+
+def test_cursor_pages_cover_legacy_rows_once(make_reminder, monkeypatch):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    user_id = "user-paging"
+    rems = [make_reminder(user_id=user_id, created_at=(base + timedelta(seconds=i)).isoformat()) for i in range(7)]
+    legacy = [r["id"] for r in rems[::2]]
+    # Rows written before created_ts existed, not yet reached by the backfill.
+    with Session(db.engine) as s:
+        s.execute(update(db.Reminder).where(db.Reminder.id.in_(legacy)).values(created_ts=None))
+        s.commit()
+    monkeypatch.setattr(db, "_backfill_pending", True)
+    monkeypatch.setattr(db, "_backfill_checked", float("inf"))
+
+    for limit in (1, 2, 3, 10):
+        seen = _pages(user_id, limit)
+        assert len(seen) == len(set(seen)) == len(rems)
+        stamped = [r["id"] for r in reversed(rems) if r["id"] not in legacy]
+        # Newest first; unstamped rows sort as the oldest.
+        assert seen[:len(stamped)] == stamped
+        assert set(seen[len(stamped):]) == set(legacy)
+
+    db.backfill_timestamps()
+    assert _pages(user_id, 2) == [r["id"] for r in reversed(rems)]